@@ -0,0 +1,173 @@
+"""
+Measure the memory used by RotelMediaPlayer entities.
+
+Traffic is recorded from the rsp1570serial emulator and then replayed
+into many entities to report the bytes retained per entity and the
+memory blocks allocated while each frame is handled.
+
+tracemalloc only sees blocks that are still allocated, so the blocks per
+frame are those allocated and kept by handling a frame; blocks that are
+allocated and freed again within a frame only show in the peak bytes.
+"""
+
+import argparse
+import asyncio
+import gc
+import tracemalloc
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import List
+
+from rsp1570serial.emulator import RotelRSP1570Emulator
+from rsp1570serial.messages import AnyMessage, MessageCodec
+from rsp1570serial.protocol import decode_protocol_stream
+from rsp1570serial.rotel_model_meta import ROTEL_MODELS, RotelModelMeta
+
+from custom_components.rotel.media_player import (
+    RotelConnectionWrapperFactory,
+    RotelMediaPlayer,
+    make_alias_source_map,
+)
+
+
+class RecordingWriter:
+    """Stands in for the emulator's StreamWriter and records what it writes."""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data: bytes):
+        self.data.extend(data)
+
+    async def drain(self):
+        pass
+
+
+async def record_traffic(meta: RotelModelMeta) -> bytes:
+    """Drive the emulator through a typical session and return the raw bytes."""
+    emulator = RotelRSP1570Emulator(meta)
+    writer = RecordingWriter()
+    emulator.add_observer(writer)
+    await emulator.turn_on()
+    for source in meta.sources:
+        await emulator.set_source(source.standard_name)
+        for _ in range(10):
+            await emulator.volume_up()
+        await emulator.set_party_mode(True)
+        await emulator.display_refresh()
+        await emulator.set_party_mode(False)
+        for _ in range(10):
+            await emulator.volume_down()
+    await emulator.turn_off()
+    return bytes(writer.data)
+
+
+async def decode_traffic(meta: RotelModelMeta, data: bytes) -> List[AnyMessage]:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    codec = MessageCodec(meta)
+    return [codec.decode_message(p) async for p in decode_protocol_stream(reader)]
+
+
+def make_entity(meta: RotelModelMeta, index: int) -> RotelMediaPlayer:
+    unique_id = f"rotel_benchmark_{index}"
+    conn_factory = RotelConnectionWrapperFactory("/dev/null", unique_id, meta)
+    entity = RotelMediaPlayer(
+        unique_id, unique_id, conn_factory, make_alias_source_map(meta, None)
+    )
+    # Just enough of hass for the message handlers
+    entity.hass = SimpleNamespace(bus=SimpleNamespace(async_fire=lambda *args: None))
+    entity.async_schedule_update_ha_state = lambda: None
+    return entity
+
+
+# Leave out the blocks allocated by the measurement itself
+SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+]
+
+
+def count_blocks() -> int:
+    snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+    return sum(stat.count for stat in snapshot.statistics("filename"))
+
+
+@dataclass
+class MemoryReport:
+    entities: int
+    frames: int
+    bytes_per_entity: float
+    blocks_per_frame: float
+    retained_bytes_per_frame: float
+    peak_bytes_per_frame: float
+
+
+def measure(meta: RotelModelMeta, messages: List[AnyMessage], count: int):
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+
+    entities = [make_entity(meta, i) for i in range(count)]
+    for entity in entities:
+        for message in messages:
+            entity.handle_message(message)
+    gc.collect()
+    populated, _ = tracemalloc.get_traced_memory()
+
+    # Replay the traffic once more into a warmed up entity, frame by frame.
+    # Tracing restarts so that the snapshots only hold the new blocks
+    entity = entities[0]
+    del entities
+    tracemalloc.stop()
+    gc.collect()
+    tracemalloc.start()
+    # The filters compile and cache their patterns the first time
+    count_blocks()
+    blocks = 0
+    retained = 0
+    peak = 0
+    for message in messages:
+        blocks_before = count_blocks()
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        entity.handle_message(message)
+        after, frame_peak = tracemalloc.get_traced_memory()
+        blocks += count_blocks() - blocks_before
+        retained += after - before
+        peak += frame_peak - before
+    tracemalloc.stop()
+
+    return MemoryReport(
+        entities=count,
+        frames=len(messages),
+        bytes_per_entity=(populated - baseline) / count,
+        blocks_per_frame=blocks / len(messages),
+        retained_bytes_per_frame=retained / len(messages),
+        peak_bytes_per_frame=peak / len(messages),
+    )
+
+
+async def main(model: str, count: int):
+    meta = ROTEL_MODELS[model]
+    messages = await decode_traffic(meta, await record_traffic(meta))
+    report = measure(meta, messages, count)
+    print(f"Model:                    {model}")
+    print(f"Entities:                 {report.entities}")
+    print(f"Frames per entity:        {report.frames}")
+    print(f"Bytes per entity:         {report.bytes_per_entity:.0f}")
+    print(f"Blocks per frame:         {report.blocks_per_frame:.1f}")
+    print(f"Retained bytes per frame: {report.retained_bytes_per_frame:.1f}")
+    print(f"Peak bytes per frame:     {report.peak_bytes_per_frame:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-m", "--model", choices=sorted(ROTEL_MODELS), default="rsp1572"
+    )
+    parser.add_argument("-n", "--entities", type=int, default=500)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.model, args.entities))
@@ -0,0 +1,290 @@
+"""
+Measure event loop lag with many RotelMediaPlayer entities under load.
+
+Home Assistant is booted in-process with the rotel platform configured
+for N devices.   RotelAmpConn is replaced by SyntheticAmpConn, which
+replays traffic recorded from the rsp1570serial emulator at M messages
+per second per device.   For each combination of N and M the event loop
+lag, state writes per second and CPU time per message are reported,
+along with whether one core was saturated.
+"""
+
+import argparse
+import asyncio
+import gc
+import itertools
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from dataclasses import dataclass
+from functools import partial
+from types import SimpleNamespace
+from typing import List, Sequence
+from unittest.mock import patch
+
+from rsp1570serial.messages import AnyMessage
+from rsp1570serial.rotel_model_meta import ROTEL_MODELS, RotelModelMeta
+
+from benchmark_memory import decode_traffic, record_traffic
+from homeassistant import bootstrap, config_entries, loader
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_component import DATA_INSTANCES
+from homeassistant.setup import async_setup_component
+
+# Interval at which the event loop lag is sampled
+LAG_SAMPLE_INTERVAL = 0.01
+# Time allowed for the entities to settle before measuring
+WARMUP_TIME = 1.0
+# A run is saturated if less than this fraction of the messages are delivered
+MIN_DELIVERY_RATIO = 0.95
+# or if the process needs more than this fraction of one core
+MAX_CPU_LOAD = 0.9
+
+
+class SyntheticAmpConn:
+    """Stands in for RotelAmpConn and replays messages at a fixed rate."""
+
+    def __init__(
+        self,
+        serial_port: str,
+        meta: RotelModelMeta,
+        messages: Sequence[AnyMessage],
+        rate: float,
+        counter: List[int],
+    ):
+        self.serial_port = serial_port
+        self.meta = meta
+        self.messages = messages
+        self.rate = rate
+        self.counter = counter
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def send_command(self, command_name: str):
+        pass
+
+    async def send_volume_direct_command(self, zone: int, volume: int):
+        pass
+
+    async def read_messages(self):
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.rate
+        # Spread the devices out rather than have them all send at once
+        next_time = loop.time() + random.random() * interval
+        for message in itertools.cycle(self.messages):
+            # Messages that fall behind are queued up, as they would be
+            # in the serial port's buffer, rather than dropped
+            await asyncio.sleep(max(0.0, next_time - loop.time()))
+            self.counter[0] += 1
+            yield message
+            next_time += interval
+
+
+async def async_start_hass(config_dir: str) -> HomeAssistant:
+    """Boot just enough of Home Assistant to run the media_player platform."""
+    hass = HomeAssistant(config_dir)
+    loader.async_setup(hass)
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await bootstrap.async_load_base_functionality(hass)
+    hass.config.skip_pip = True
+    # media_player only needs http to register its image view
+    hass.config.components.add("http")
+    hass.http = SimpleNamespace(register_view=lambda view: None)
+    await hass.async_start()
+    return hass
+
+
+async def monitor_lag(samples: List[float]):
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(LAG_SAMPLE_INTERVAL)
+        samples.append(loop.time() - start - LAG_SAMPLE_INTERVAL)
+
+
+@dataclass
+class ScaleReport:
+    entities: int
+    rate: float
+    offered_per_second: float
+    delivered_per_second: float
+    state_writes_per_second: float
+    skipped_writes_per_second: float
+    cpu_per_message: float
+    cpu_load: float
+    lag_p50: float
+    lag_p99: float
+    lag_max: float
+
+    @property
+    def saturated(self) -> bool:
+        return (
+            self.delivered_per_second < MIN_DELIVERY_RATIO * self.offered_per_second
+            or self.cpu_load > MAX_CPU_LOAD
+        )
+
+
+async def run_scale(
+    model: str,
+    messages: Sequence[AnyMessage],
+    entities: int,
+    rate: float,
+    duration: float,
+) -> ScaleReport:
+    delivered = [0]
+    conn_class = partial(
+        SyntheticAmpConn, messages=messages, rate=rate, counter=delivered
+    )
+    with tempfile.TemporaryDirectory() as config_dir:
+        os.symlink(
+            os.path.abspath("custom_components"),
+            os.path.join(config_dir, "custom_components"),
+        )
+        hass = await async_start_hass(config_dir)
+        with patch("custom_components.rotel.media_player.RotelAmpConn", conn_class):
+            await async_setup_component(
+                hass,
+                "media_player",
+                {
+                    "media_player": [
+                        {
+                            "platform": "rotel",
+                            "unique_id": f"rotel_scale_{i}",
+                            "name": f"Rotel Scale {i}",
+                            "device": f"/dev/rotel{i}",
+                            "model_spec": {"model": model},
+                        }
+                        for i in range(entities)
+                    ]
+                },
+            )
+            await hass.async_block_till_done()
+            await asyncio.sleep(WARMUP_TIME)
+
+            state_writes = 0
+
+            def count_state_write(event):
+                nonlocal state_writes
+                state_writes += 1
+
+            remove_listener = hass.bus.async_listen(
+                EVENT_STATE_CHANGED, count_state_write
+            )
+            players = list(hass.data[DATA_INSTANCES]["media_player"].entities)
+            skipped_at_start = sum(p.skipped_state_writes for p in players)
+            lag_samples: List[float] = []
+            lag_task = asyncio.create_task(monitor_lag(lag_samples))
+            gc.collect()
+            delivered_at_start = delivered[0]
+            cpu_at_start = time.process_time()
+            wall_at_start = time.perf_counter()
+            await asyncio.sleep(duration)
+            wall = time.perf_counter() - wall_at_start
+            cpu = time.process_time() - cpu_at_start
+            handled = delivered[0] - delivered_at_start
+            skipped = sum(p.skipped_state_writes for p in players) - skipped_at_start
+            lag_task.cancel()
+            remove_listener()
+            await hass.async_stop()
+
+    lag_samples.sort()
+    return ScaleReport(
+        entities=entities,
+        rate=rate,
+        offered_per_second=entities * rate,
+        delivered_per_second=handled / wall,
+        state_writes_per_second=state_writes / wall,
+        skipped_writes_per_second=skipped / wall,
+        cpu_per_message=cpu / handled if handled else float("nan"),
+        cpu_load=cpu / wall,
+        lag_p50=statistics.median(lag_samples),
+        lag_p99=lag_samples[int(0.99 * (len(lag_samples) - 1))],
+        lag_max=lag_samples[-1],
+    )
+
+
+def format_report(model: str, duration: float, reports: List[ScaleReport]) -> str:
+    lines = [
+        f"## Scale report for {model}",
+        "",
+        f"Each run was measured for {duration:g}s.   Lag is in milliseconds.",
+        "",
+        "Entities | Msg/s per entity | Msg/s offered | Msg/s delivered "
+        "| State writes/s | Skipped writes/s | CPU µs/msg | CPU load "
+        "| Lag p50 | Lag p99 | Lag max | Saturated",
+        "---|---|---|---|---|---|---|---|---|---|---|---",
+    ]
+    for r in reports:
+        lines.append(
+            f"{r.entities} | {r.rate:g} | {r.offered_per_second:.0f} "
+            f"| {r.delivered_per_second:.0f} | {r.state_writes_per_second:.0f} "
+            f"| {r.skipped_writes_per_second:.0f} "
+            f"| {1e6 * r.cpu_per_message:.0f} | {r.cpu_load:.0%} "
+            f"| {1e3 * r.lag_p50:.1f} | {1e3 * r.lag_p99:.1f} "
+            f"| {1e3 * r.lag_max:.1f} | {'yes' if r.saturated else 'no'}"
+        )
+    saturated = [r for r in reports if r.saturated]
+    lines.append("")
+    if saturated:
+        first = min(saturated, key=lambda r: r.offered_per_second)
+        lines.append(
+            f"One core saturates at {first.entities} entities "
+            f"x {first.rate:g} msg/s ({first.offered_per_second:.0f} msg/s)."
+        )
+    else:
+        lines.append("One core was not saturated by any of the runs.")
+    return "\n".join(lines) + "\n"
+
+
+async def main(
+    model: str,
+    entity_counts: List[int],
+    rates: List[float],
+    duration: float,
+    output: str | None,
+):
+    meta = ROTEL_MODELS[model]
+    messages = await decode_traffic(meta, await record_traffic(meta))
+    reports = []
+    for entities, rate in itertools.product(entity_counts, rates):
+        report = await run_scale(model, messages, entities, rate, duration)
+        print(
+            f"{entities} entities x {rate:g} msg/s: "
+            f"lag p99 {1e3 * report.lag_p99:.1f}ms, "
+            f"CPU load {report.cpu_load:.0%}"
+        )
+        reports.append(report)
+    text = format_report(model, duration, reports)
+    print()
+    print(text)
+    if output is not None:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-m", "--model", choices=sorted(ROTEL_MODELS), default="rsp1572"
+    )
+    parser.add_argument(
+        "-n", "--entities", type=int, nargs="+", default=[1, 10, 50, 100, 200]
+    )
+    parser.add_argument(
+        "-r", "--rate", type=float, nargs="+", default=[1.0, 10.0, 50.0]
+    )
+    parser.add_argument("-d", "--duration", type=float, default=10.0)
+    parser.add_argument("-o", "--output", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    # Keep the custom integration warnings out of the report
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(main(args.model, args.entities, args.rate, args.duration, args.output))
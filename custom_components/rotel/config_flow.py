@@ -0,0 +1,136 @@
+"""Config flow for the Rotel Media Player component."""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+import voluptuous as vol
+
+from homeassistant import config_entries
+from homeassistant.const import CONF_DEVICE, CONF_HOST, CONF_NAME
+from homeassistant.data_entry_flow import FlowResult
+from homeassistant.helpers import config_validation as cv
+
+from . import DOMAIN
+from .discovery import (
+    DiscoveredDevice,
+    async_discover,
+    list_serial_ports,
+    make_socket_urls,
+)
+from .media_player import CONF_MODEL, DEFAULT_NAME, devices_in_use
+
+_LOGGER = logging.getLogger(__name__)
+
+CONF_SERIAL_PORTS = "serial_ports"
+CONF_PORT_START = "port_start"
+CONF_PORT_END = "port_end"
+DEFAULT_PORT_START = 4000
+DEFAULT_PORT_END = 4010
+# Keeps a mistyped range from probing for minutes
+MAX_PORT_RANGE = 256
+
+
+def make_user_schema(serial_ports: List[str]) -> vol.Schema:
+    """
+    Return the schema for the user step.
+
+    Probing writes to a port so only the serial ports that the user picks
+    are searched; the others could belong to other integrations.
+    """
+    return vol.Schema(
+        {
+            vol.Optional(CONF_SERIAL_PORTS, default=[]): cv.multi_select(
+                {port: port for port in serial_ports}
+            ),
+            vol.Optional(CONF_HOST): str,
+            vol.Optional(CONF_PORT_START, default=DEFAULT_PORT_START): vol.All(
+                vol.Coerce(int), vol.Range(min=1, max=65535)
+            ),
+            vol.Optional(CONF_PORT_END, default=DEFAULT_PORT_END): vol.All(
+                vol.Coerce(int), vol.Range(min=1, max=65535)
+            ),
+        }
+    )
+
+
+class RotelConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
+    """Find Rotel devices on serial ports and a range of TCP ports."""
+
+    VERSION = 1
+
+    def __init__(self):
+        self._discovered: Dict[str, DiscoveredDevice] = {}
+
+    async def async_step_user(
+        self, user_input: Optional[Dict[str, Any]] = None
+    ) -> FlowResult:
+        errors = {}
+        # Don't probe devices that are in use, whether by entries or YAML
+        in_use = devices_in_use(self.hass) | self._async_current_ids()
+        serial_ports = [
+            port
+            for port in await self.hass.async_add_executor_job(list_serial_ports)
+            if port not in in_use
+        ]
+        if user_input is not None:
+            port_start = user_input[CONF_PORT_START]
+            port_end = user_input[CONF_PORT_END]
+            host = user_input.get(CONF_HOST)
+            devices = [
+                port for port in user_input[CONF_SERIAL_PORTS] if port not in in_use
+            ]
+            if host:
+                devices += [
+                    url
+                    for url in make_socket_urls(host, port_start, port_end)
+                    if url not in in_use
+                ]
+            if not 0 <= port_end - port_start < MAX_PORT_RANGE:
+                errors["base"] = "invalid_port_range"
+            elif not devices:
+                errors["base"] = "nothing_to_search"
+            else:
+                _LOGGER.debug("Probing %d devices", len(devices))
+                self._discovered = {d.device: d for d in await async_discover(devices)}
+                if self._discovered:
+                    return await self.async_step_select()
+                errors["base"] = "no_devices_found"
+
+        return self.async_show_form(
+            step_id="user",
+            data_schema=self.add_suggested_values_to_schema(
+                make_user_schema(serial_ports), user_input
+            ),
+            errors=errors,
+        )
+
+    async def async_step_select(
+        self, user_input: Optional[Dict[str, Any]] = None
+    ) -> FlowResult:
+        if user_input is not None:
+            found = self._discovered[user_input[CONF_DEVICE]]
+            await self.async_set_unique_id(found.device)
+            self._abort_if_unique_id_configured()
+            return self.async_create_entry(
+                title=user_input[CONF_NAME],
+                data={
+                    CONF_DEVICE: found.device,
+                    CONF_MODEL: found.model,
+                    CONF_NAME: user_input[CONF_NAME],
+                },
+            )
+
+        return self.async_show_form(
+            step_id="select",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_DEVICE): vol.In(
+                        {
+                            d.device: f"{d.model.upper()} on {d.device}"
+                            for d in self._discovered.values()
+                        }
+                    ),
+                    vol.Optional(CONF_NAME, default=DEFAULT_NAME): str,
+                }
+            ),
+        )
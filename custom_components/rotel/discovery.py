@@ -0,0 +1,145 @@
+"""Discovery of Rotel devices on serial ports and TCP/IP to serial converters."""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from rsp1570serial.connection import RotelAmpConn
+from rsp1570serial.messages import MessageCodec
+from rsp1570serial.protocol import decode_protocol_stream
+from rsp1570serial.rotel_model_meta import ROTEL_MODELS
+from serial.tools.list_ports import comports
+
+_LOGGER = logging.getLogger(__name__)
+
+SOCKET_URL_PREFIX = "socket://"
+# A device that is on answers DISPLAY_REFRESH well within this
+PROBE_TIMEOUT = 2.0
+MAX_CONCURRENT_PROBES = 16
+
+
+@dataclass
+class DiscoveredDevice:
+    device: str
+    model: str
+
+
+def list_serial_ports() -> List[str]:
+    """Return the candidate serial ports.  This blocks so run it in an executor."""
+    return [port.device for port in comports()]
+
+
+def make_socket_urls(host: str, port_start: int, port_end: int) -> List[str]:
+    """Return a socket URL for each port in the inclusive range."""
+    return [
+        f"{SOCKET_URL_PREFIX}{host}:{port}" for port in range(port_start, port_end + 1)
+    ]
+
+
+def detect_model(payload: bytes) -> Optional[str]:
+    """Return the model that sent payload, based on its device id byte."""
+    for meta in ROTEL_MODELS.values():
+        if payload and payload[0] == meta.device_id:
+            return meta.model_id
+    return None
+
+
+def _make_conn(device: str) -> RotelAmpConn:
+    # The meta doesn't matter because the connection is only used for bytes
+    return RotelAmpConn(device, ROTEL_MODELS[next(iter(ROTEL_MODELS))])
+
+
+async def _async_open_socket(
+    device: str,
+) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """
+    Open a TCP/IP to serial converter.
+
+    The socket is connected with loop.create_connection rather than by
+    pyserial in an executor, so this can be cancelled by a timeout.
+    """
+    conn = _make_conn(device)
+    await conn.open()
+    assert conn.reader is not None and conn.writer is not None
+    return conn.reader, conn.writer
+
+
+async def _async_open_serial(
+    device: str,
+) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """
+    Open a serial port.
+
+    The port is opened in an executor, which can't be cancelled, so if
+    this is cancelled then the port is closed once the open completes
+    rather than being left open.
+    """
+    conn = _make_conn(device)
+    open_task = asyncio.ensure_future(conn.open())
+    try:
+        await asyncio.shield(open_task)
+    except asyncio.CancelledError:
+
+        def close_once_open(task: asyncio.Future):
+            if not task.cancelled() and task.exception() is None:
+                assert conn.writer is not None
+                conn.writer.close()
+
+        open_task.add_done_callback(close_once_open)
+        raise
+    assert conn.reader is not None and conn.writer is not None
+    return conn.reader, conn.writer
+
+
+async def async_probe(
+    device: str, timeout: float = PROBE_TIMEOUT
+) -> Optional[DiscoveredDevice]:
+    """
+    Probe a device for a Rotel processor.
+
+    A DISPLAY_REFRESH is sent for each known model and the model is
+    detected from the device id of the first response.   Note that
+    a processor that is turned off won't respond.
+
+    Opening a serial port isn't covered by timeout because a timeout
+    can't stop it; see _async_open_serial.
+    """
+    writer = None
+    try:
+        if device.startswith(SOCKET_URL_PREFIX):
+            async with asyncio.timeout(timeout):
+                reader, writer = await _async_open_socket(device)
+        else:
+            reader, writer = await _async_open_serial(device)
+        async with asyncio.timeout(timeout):
+            for meta in ROTEL_MODELS.values():
+                writer.write(MessageCodec(meta).encode_command("DISPLAY_REFRESH"))
+            await writer.drain()
+            async for payload in decode_protocol_stream(reader):
+                model = detect_model(payload)
+                if model is not None:
+                    _LOGGER.info("Found %s on %s", model, device)
+                    return DiscoveredDevice(device, model)
+    except (OSError, TimeoutError) as err:
+        _LOGGER.debug("Nothing found on %s: %r", device, err)
+    finally:
+        if writer is not None:
+            writer.close()
+    return None
+
+
+async def async_discover(
+    devices: Iterable[str],
+    timeout: float = PROBE_TIMEOUT,
+    max_concurrent_probes: int = MAX_CONCURRENT_PROBES,
+) -> List[DiscoveredDevice]:
+    """Probe devices concurrently and return the Rotel processors found."""
+    semaphore = asyncio.Semaphore(max_concurrent_probes)
+
+    async def async_bounded_probe(device: str) -> Optional[DiscoveredDevice]:
+        async with semaphore:
+            return await async_probe(device, timeout)
+
+    results = await asyncio.gather(*[async_bounded_probe(d) for d in devices])
+    return [r for r in results if r is not None]
@@ -0,0 +1,186 @@
+"""Run the connection to a Rotel device on a dedicated I/O thread."""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Coroutine, Deque, Dict, Optional, Tuple
+
+from rsp1570serial.connection import RotelAmpConn
+from rsp1570serial.messages import AnyMessage, MessageCodec, RotelMessageError
+from rsp1570serial.protocol import decode_protocol_stream
+from rsp1570serial.rotel_model_meta import RotelModelMeta
+
+_LOGGER = logging.getLogger(__name__)
+
+# Messages waiting for the event loop beyond this many are dropped, oldest first
+MAX_QUEUE_DEPTH = 64
+
+
+@dataclass
+class IoQueueStats:
+    """Measurements of the queue between the I/O thread and the event loop."""
+
+    messages: int = 0
+    coalesced: int = 0
+    dropped: int = 0
+    depth: int = 0
+    max_depth: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        mean_latency = self.total_latency / self.messages if self.messages else 0.0
+        return {
+            "messages": self.messages,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "mean_latency_ms": round(1000 * mean_latency, 3),
+            "max_latency_ms": round(1000 * self.max_latency, 3),
+        }
+
+
+class ThreadedAmpConn:
+    """
+    A RotelAmpConn that reads and decodes on its own thread and event loop.
+
+    It has the same interface as RotelAmpConn.   Decoded messages are
+    handed to the caller's event loop through a bounded queue.   A message
+    that is identical to the last one still waiting in the queue is
+    coalesced with it because the device often repeats itself and only
+    the latest state matters.
+    """
+
+    def __init__(
+        self,
+        serial_port: str,
+        meta: RotelModelMeta,
+        max_depth: int = MAX_QUEUE_DEPTH,
+    ):
+        self.serial_port = serial_port
+        self.meta = meta
+        self.stats = IoQueueStats()
+        self._conn = RotelAmpConn(serial_port, meta)
+        self._max_depth = max_depth
+        # Payload, decoded message and the time it was queued
+        self._queue: Deque[Tuple[bytes, AnyMessage, float]] = deque()
+        self._lock = threading.Lock()
+        self._io_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._reader_future = None
+        self._wake = None
+
+    async def open(self):
+        """Start the I/O thread and open the connection on it."""
+        self._io_loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._io_loop.run_forever,
+            name=f"rotel_io {self.serial_port}",
+            daemon=True,
+        )
+        self._thread.start()
+        try:
+            await self._run(self._conn.open())
+        except BaseException:
+            await self._async_stop_thread()
+            raise
+
+    async def close(self):
+        """Close the connection and stop the I/O thread."""
+        if self._io_loop is None:
+            return
+        if self._reader_future is not None:
+            self._reader_future.cancel()
+        await self._run(self._conn.close())
+        await self._async_stop_thread()
+
+    async def send_command(self, command_name: str):
+        await self._run(self._conn.send_command(command_name))
+
+    async def send_volume_direct_command(self, zone: int, volume: int):
+        await self._run(self._conn.send_volume_direct_command(zone, volume))
+
+    async def read_messages(self) -> AsyncGenerator[AnyMessage, None]:
+        assert self._io_loop is not None
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        # Only called when the queue was empty so that a burst costs one wakeup
+        self._wake = lambda: loop.call_soon_threadsafe(ready.set)
+        self._reader_future = asyncio.run_coroutine_threadsafe(
+            self._async_read_worker(), self._io_loop
+        )
+        self._reader_future.add_done_callback(lambda f: self._wake())
+        try:
+            while True:
+                await ready.wait()
+                ready.clear()
+                while (message := self._get()) is not None:
+                    yield message
+                if self._reader_future.done():
+                    # End of stream or closed; raise any exception from the worker
+                    if not self._reader_future.cancelled():
+                        self._reader_future.result()
+                    return
+        finally:
+            self._reader_future.cancel()
+
+    async def _run(self, coro: Coroutine[Any, Any, Any]) -> Any:
+        if self._io_loop is None:
+            coro.close()
+            raise ConnectionError(f"{self.serial_port} is not open")
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(coro, self._io_loop)
+        )
+
+    async def _async_stop_thread(self):
+        assert self._io_loop is not None and self._thread is not None
+        self._io_loop.call_soon_threadsafe(self._io_loop.stop)
+        await asyncio.get_running_loop().run_in_executor(None, self._thread.join)
+        self._io_loop.close()
+        self._io_loop = None
+        self._thread = None
+
+    async def _async_read_worker(self):
+        """Read and decode messages.  Runs on the I/O thread."""
+        assert self._conn.reader is not None
+        codec = MessageCodec(self.meta)
+        async for payload in decode_protocol_stream(self._conn.reader):
+            try:
+                message = codec.decode_message(payload)
+            except RotelMessageError:
+                _LOGGER.exception("Discarding payload %r", payload)
+            else:
+                self._put(payload, message)
+
+    def _put(self, payload: bytes, message: AnyMessage):
+        stats = self.stats
+        with self._lock:
+            if self._queue and self._queue[-1][0] == payload:
+                stats.coalesced += 1
+                return
+            if len(self._queue) >= self._max_depth:
+                self._queue.popleft()
+                stats.dropped += 1
+            self._queue.append((payload, message, time.monotonic()))
+            stats.depth = len(self._queue)
+            stats.max_depth = max(stats.max_depth, stats.depth)
+            was_empty = stats.depth == 1
+        if was_empty:
+            self._wake()
+
+    def _get(self) -> Optional[AnyMessage]:
+        stats = self.stats
+        with self._lock:
+            if not self._queue:
+                return None
+            _, message, queued_at = self._queue.popleft()
+            stats.depth = len(self._queue)
+            latency = time.monotonic() - queued_at
+            stats.messages += 1
+            stats.total_latency += latency
+            stats.max_latency = max(stats.max_latency, latency)
+        return message
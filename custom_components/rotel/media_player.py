@@ -1,12 +1,21 @@
 """Rotel RSP-1570 media player platform."""
 
 import asyncio
+import cProfile
+import io
 import logging
-from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional
+import math
+import pstats
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
 import voluptuous as vol
 from rsp1570serial.connection import RotelAmpConn
+from rsp1570serial.icons import DISPLAY_ICON_DEFINITIONS
 from rsp1570serial.messages import (
     AnyMessage,
     FeedbackMessage,
@@ -19,6 +28,7 @@ from rsp1570serial.rotel_model_meta import (
     RotelModelMeta,
 )
 
+from homeassistant.components import mqtt
 from homeassistant.components.media_player import (
     PLATFORM_SCHEMA,
     MediaPlayerDeviceClass,
@@ -28,26 +38,72 @@ from homeassistant.components.media_player.const import (
     MediaPlayerEntityFeature,
     MediaPlayerState,
 )
+from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    ATTR_STATE,
     CONF_DEVICE,
     CONF_NAME,
     CONF_UNIQUE_ID,
     EVENT_HOMEASSISTANT_STOP,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers import entity_platform
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.reload import async_setup_reload_service
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
 
+from . import DOMAIN, PLATFORMS
+from .io_thread import IoQueueStats, ThreadedAmpConn
+from .mqtt_bridge import RotelMqttBridge
+
 DEFAULT_NAME = "Rotel RSP-1570"
 DEFAULT_MODEL = RSP1570_MODEL_ID
+# Commands after POWER_ON are held until the device reports that it is on,
+# or for at most this long
+DEFAULT_POWER_ON_TIMEOUT = 15.0
+MAX_POWER_ON_TIMEOUT = 120.0
 
 _LOGGER = logging.getLogger(__name__)
 
 CONF_MODEL_SPEC = "model_spec"
 CONF_MODEL = "model"
 CONF_SOURCE_ALIASES = "source_aliases"
+CONF_ATTRIBUTES = "attributes"
+CONF_RECORDED_ATTRIBUTES = "recorded_attributes"
+CONF_IO_THREAD = "io_thread"
+CONF_MQTT_TOPIC = "mqtt_topic"
+CONF_POWER_ON_TIMEOUT = "power_on_timeout"
+
+ATTR_DISPLAY_VOLUME = "display_volume"
+ATTR_PARTY_MODE_ON = "party_mode_on"
+ATTR_INFO = "info"
+ATTR_ICONS = "icons"
+ATTR_SPEAKER_ICONS = "speaker_icons"
+ATTR_STATE_ICONS = "state_icons"
+ATTR_INPUT_ICONS = "input_icons"
+ATTR_SOUND_MODE_ICONS = "sound_mode_icons"
+ATTR_MISC_ICONS = "misc_icons"
+ATTR_TRIGGERS = "triggers"
+ATTR_SMART_DISPLAY = "smart_display"  # RSP1572 only
+ATTR_IO_QUEUE = "io_queue"  # Only with io_thread
+ATTR_CIRCUIT_BREAKER = "circuit_breaker"
+ATTR_TIME_TO_READY = "time_to_ready"  # Once measured
+
+# The high churn attributes, grouped so that they can be selected in config
+ATTRIBUTE_GROUPS = {
+    "icons": (ATTR_ICONS,),
+    "speaker": (ATTR_SPEAKER_ICONS,),
+    "sound_mode": (ATTR_SOUND_MODE_ICONS,),
+    "input": (ATTR_INPUT_ICONS,),
+    "state": (ATTR_STATE_ICONS,),
+    "misc": (ATTR_MISC_ICONS,),
+    "triggers": (ATTR_TRIGGERS,),
+    "smart_display": (ATTR_SMART_DISPLAY,),
+}
 
 
 def make_model_spec_schema(meta: RotelModelMeta) -> vol.Schema:
@@ -81,25 +137,74 @@ ROTEL_SCHEMA = {
         ): vol.Any(str, None)
     },
     vol.Exclusive(CONF_MODEL_SPEC, "model_spec"): validate_model_spec,
+    vol.Optional(CONF_ATTRIBUTES, default=list(ATTRIBUTE_GROUPS)): vol.All(
+        cv.ensure_list, [vol.In(ATTRIBUTE_GROUPS)]
+    ),
+    vol.Optional(CONF_RECORDED_ATTRIBUTES, default=[]): vol.All(
+        cv.ensure_list, [vol.In(ATTRIBUTE_GROUPS)]
+    ),
+    vol.Optional(CONF_IO_THREAD, default=False): cv.boolean,
+    vol.Optional(CONF_MQTT_TOPIC): mqtt.valid_publish_topic,
+    vol.Optional(CONF_POWER_ON_TIMEOUT, default=DEFAULT_POWER_ON_TIMEOUT): vol.All(
+        vol.Coerce(float), vol.Range(min=0, max=MAX_POWER_ON_TIMEOUT)
+    ),
 }
 
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(ROTEL_SCHEMA)
 
-ATTR_DISPLAY_VOLUME = "display_volume"
-ATTR_PARTY_MODE_ON = "party_mode_on"
-ATTR_INFO = "info"
-ATTR_ICONS = "icons"
-ATTR_SPEAKER_ICONS = "speaker_icons"
-ATTR_STATE_ICONS = "state_icons"
-ATTR_INPUT_ICONS = "input_icons"
-ATTR_SOUND_MODE_ICONS = "sound_mode_icons"
-ATTR_MISC_ICONS = "misc_icons"
-ATTR_TRIGGERS = "triggers"
-ATTR_SMART_DISPLAY = "smart_display"  # RSP1572 only
+ATTR_ZONE = "zone"
+ATTR_TRIGGER = "trigger"
+ATTR_ICON = "icon"
+EVENT_TRIGGER_CHANGED = "rotel_trigger_changed"
+EVENT_ICON_CHANGED = "rotel_icon_changed"
 
 ATTR_COMMAND_NAME = "command_name"
+ATTR_WAIT_FOR_CONFIRMATION = "wait_for_confirmation"
+ATTR_TIMEOUT = "timeout"
+ATTR_VOLUME_LEVEL = "volume_level"
+ATTR_DURATION = "duration"
 SERVICE_SEND_COMMAND = "rotel_send_command"
 SERVICE_RECONNECT = "rotel_reconnect"
+SERVICE_RAMP_VOLUME = "rotel_ramp_volume"
+SERVICE_PROFILE = "rotel_profile"
+SERVICE_SNAPSHOT = "rotel_snapshot"
+SERVICE_RESTORE = "rotel_restore"
+
+# Long enough for the device to power on
+DEFAULT_CONFIRMATION_TIMEOUT = 10.0
+DEFAULT_RAMP_DURATION = 5.0
+# Volume ramps never step faster than this, however quickly the device responds
+MIN_RAMP_STEP_INTERVAL = 0.1
+# Initial guess at the time between a volume command and its feedback message
+INITIAL_FEEDBACK_LATENCY = 0.2
+# Give up waiting for feedback after this many multiples of the current latency
+RAMP_FEEDBACK_TIMEOUT_FACTOR = 5.0
+# Volume up and down presses within this are sent as one direct volume command
+VOLUME_STEP_WINDOW = 0.2
+DEFAULT_PROFILE_DURATION = 60.0
+MAX_PROFILE_DURATION = 600.0
+# Number of functions listed in the profile summary
+PROFILE_SUMMARY_LIMIT = 30
+
+# Open connections are kept here while the entities that own them are reloaded
+DATA_PARKED_CONNECTIONS = f"{DOMAIN}_parked_connections"
+# A reload re-adds the entity well within this; otherwise the connection is closed
+PARK_TIMEOUT = 30.0
+# Messages that arrive while parked are kept for the new entity, up to this many
+MAX_PARKED_MESSAGES = 32
+# Weight given to each new latency sample in the moving average
+FEEDBACK_LATENCY_SMOOTHING = 0.3
+# A DISPLAY_REFRESH is sent when nothing has been heard from the device for
+# this long after a command, doubling while it stays quiet up to the maximum
+MIN_REFRESH_INTERVAL = 10.0
+MAX_REFRESH_INTERVAL = 600.0
+# A write to the device that takes longer than this has failed
+WRITE_TIMEOUT = 5.0
+# Consecutive write failures that open the circuit breaker
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
 
 SPEAKER_ICON_NAMES = ("CBL", "CBR", "SB", "SL", "SR", "SW", "FL", "C", "FR")
 STATE_ICON_NAMES = (
@@ -126,6 +231,9 @@ INPUT_ICON_NAMES = ("HDMI", "Coaxial", "Optical", "A", "1", "2", "3", "4", "5")
 # Not actually sure what these are.
 # Might move them if I ever work it out.
 MISC_ICON_NAMES = ("<", ">")
+# Same order as the trigger flags bytes (and TriggerMessage.flags_to_list)
+TRIGGER_ZONE_NAMES = ("All", "Main", "Zone 2", "Zone 3", "Zone 4")
+TRIGGERS_PER_ZONE = 6
 
 
 async def async_setup_platform(
@@ -146,20 +254,85 @@ async def async_setup_platform(
         model = DEFAULT_MODEL
         source_aliases = config.get(CONF_SOURCE_ALIASES)
 
-    meta = ROTEL_MODELS[model]
+    entity = make_entity(
+        config[CONF_UNIQUE_ID],
+        config[CONF_NAME],
+        config[CONF_DEVICE],
+        model,
+        source_aliases,
+        config[CONF_ATTRIBUTES],
+        config[CONF_RECORDED_ATTRIBUTES],
+        config[CONF_IO_THREAD],
+        config.get(CONF_MQTT_TOPIC),
+        config[CONF_POWER_ON_TIMEOUT],
+    )
 
-    source_map = make_alias_source_map(meta, source_aliases)
+    async_add_entities([entity])
+    setup_hass_services(hass)
+    await async_setup_reload_service(hass, DOMAIN, PLATFORMS)
 
-    serial_port = config[CONF_DEVICE]
-    unique_id = config[CONF_UNIQUE_ID]
-    conn_factory = RotelConnectionWrapperFactory(serial_port, unique_id, meta)
 
-    entity = RotelMediaPlayer(unique_id, config[CONF_NAME], conn_factory, source_map)
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+):
+    """Set up a device found by the config flow."""
+    assert entry.unique_id is not None
+    entity = make_entity(
+        entry.unique_id,
+        entry.data[CONF_NAME],
+        entry.data[CONF_DEVICE],
+        entry.data[CONF_MODEL],
+        None,
+        list(ATTRIBUTE_GROUPS),
+        [],
+        False,
+        None,
+        DEFAULT_POWER_ON_TIMEOUT,
+    )
 
     async_add_entities([entity])
     setup_hass_services(hass)
 
 
+def make_entity(
+    unique_id: str,
+    name: str,
+    device: str,
+    model: str,
+    source_aliases: Optional[Dict[str, str]],
+    attribute_groups: List[str],
+    recorded_groups: List[str],
+    io_thread: bool,
+    mqtt_topic: Optional[str],
+    power_on_timeout: float,
+) -> "RotelMediaPlayer":
+    meta = ROTEL_MODELS[model]
+    source_map = make_alias_source_map(meta, source_aliases)
+    conn_factory = RotelConnectionWrapperFactory(device, unique_id, meta, io_thread)
+    entity_class = get_entity_class(unrecorded_attributes(recorded_groups))
+    return entity_class(
+        unique_id,
+        name,
+        conn_factory,
+        source_map,
+        frozenset(attribute_groups),
+        mqtt_topic,
+        power_on_timeout,
+    )
+
+
+def devices_in_use(hass: HomeAssistant) -> Set[str]:
+    """Return the devices of the rotel entities, however they were configured."""
+    return {
+        entity.serial_port
+        for platform in entity_platform.async_get_platforms(hass, DOMAIN)
+        for entity in platform.entities.values()
+        if isinstance(entity, RotelMediaPlayer)
+    }
+
+
 def setup_hass_services(hass):
     """
     Register services.
@@ -178,7 +351,12 @@ def setup_hass_services(hass):
                 command_name,
                 entity.entity_id,
             )
-            await entity.async_send_command(command_name)
+            if call.data[ATTR_WAIT_FOR_CONFIRMATION]:
+                await entity.async_send_command_and_confirm(
+                    command_name, call.data[ATTR_TIMEOUT]
+                )
+            else:
+                await entity.async_send_command(command_name)
         else:
             _LOGGER.error(
                 "%s service not sending command %s to incompatible entity %s",
@@ -201,16 +379,120 @@ def setup_hass_services(hass):
                 entity.entity_id,
             )
 
+    async def async_handle_ramp_volume(entity, call):
+        volume_level = call.data[ATTR_VOLUME_LEVEL]
+        duration = call.data[ATTR_DURATION]
+        if isinstance(entity, RotelMediaPlayer):
+            _LOGGER.debug(
+                "%s service ramping entity %s to %r over %rs",
+                SERVICE_RAMP_VOLUME,
+                entity.entity_id,
+                volume_level,
+                duration,
+            )
+            await entity.async_ramp_volume(volume_level, duration)
+        else:
+            _LOGGER.error(
+                "%s service not ramping volume of incompatible entity %s",
+                SERVICE_RAMP_VOLUME,
+                entity.entity_id,
+            )
+
+    async def async_handle_profile(entity, call):
+        duration = call.data[ATTR_DURATION]
+        if isinstance(entity, RotelMediaPlayer):
+            _LOGGER.debug(
+                "%s service profiling entity %s for %rs",
+                SERVICE_PROFILE,
+                entity.entity_id,
+                duration,
+            )
+            await entity.async_profile(duration)
+        else:
+            _LOGGER.error(
+                "%s service not profiling incompatible entity %s",
+                SERVICE_PROFILE,
+                entity.entity_id,
+            )
+
+    async def async_handle_snapshot(entity, call):
+        # pylint: disable=unused-argument
+        if isinstance(entity, RotelMediaPlayer):
+            _LOGGER.debug(
+                "%s service taking snapshot of entity %s",
+                SERVICE_SNAPSHOT,
+                entity.entity_id,
+            )
+            entity.snapshot()
+        else:
+            _LOGGER.error(
+                "%s service not taking snapshot of incompatible entity %s",
+                SERVICE_SNAPSHOT,
+                entity.entity_id,
+            )
+
+    async def async_handle_restore(entity, call):
+        if isinstance(entity, RotelMediaPlayer):
+            _LOGGER.debug(
+                "%s service restoring snapshot of entity %s",
+                SERVICE_RESTORE,
+                entity.entity_id,
+            )
+            await entity.async_restore(call.data[ATTR_TIMEOUT])
+        else:
+            _LOGGER.error(
+                "%s service not restoring snapshot of incompatible entity %s",
+                SERVICE_RESTORE,
+                entity.entity_id,
+            )
+
     platform = entity_platform.async_get_current_platform()
 
     platform.async_register_entity_service(
         SERVICE_SEND_COMMAND,
-        {vol.Required(ATTR_COMMAND_NAME): cv.string},
+        {
+            vol.Required(ATTR_COMMAND_NAME): cv.string,
+            vol.Optional(ATTR_WAIT_FOR_CONFIRMATION, default=False): cv.boolean,
+            vol.Optional(ATTR_TIMEOUT, default=DEFAULT_CONFIRMATION_TIMEOUT): vol.All(
+                vol.Coerce(float), vol.Range(min=0)
+            ),
+        },
         async_handle_send_command,
     )
     platform.async_register_entity_service(
         SERVICE_RECONNECT, {}, async_handle_reconnect
     )
+    platform.async_register_entity_service(
+        SERVICE_RAMP_VOLUME,
+        {
+            vol.Required(ATTR_VOLUME_LEVEL): vol.All(
+                vol.Coerce(float), vol.Range(min=0, max=1)
+            ),
+            vol.Optional(ATTR_DURATION, default=DEFAULT_RAMP_DURATION): vol.All(
+                vol.Coerce(float), vol.Range(min=0)
+            ),
+        },
+        async_handle_ramp_volume,
+    )
+    platform.async_register_entity_service(
+        SERVICE_PROFILE,
+        {
+            vol.Optional(ATTR_DURATION, default=DEFAULT_PROFILE_DURATION): vol.All(
+                vol.Coerce(float), vol.Range(min=1, max=MAX_PROFILE_DURATION)
+            ),
+        },
+        async_handle_profile,
+    )
+    platform.async_register_entity_service(SERVICE_SNAPSHOT, {}, async_handle_snapshot)
+    platform.async_register_entity_service(
+        SERVICE_RESTORE,
+        {
+            vol.Optional(ATTR_TIMEOUT, default=DEFAULT_CONFIRMATION_TIMEOUT): vol.All(
+                vol.Coerce(float), vol.Range(min=0)
+            ),
+        },
+        async_handle_restore,
+    )
 
 
 def make_alias_source_map(
@@ -234,13 +516,27 @@ def make_alias_source_map(
     return alias_source_map
 
 
+def unrecorded_attributes(recorded_groups: List[str]) -> frozenset[str]:
+    """
+    Return the attributes that are not in one of recorded_groups.
+
+    Diagnostics are never recorded, whatever recorded_groups says.
+    """
+    return frozenset(
+        attr
+        for group, attrs in ATTRIBUTE_GROUPS.items()
+        if group not in recorded_groups
+        for attr in attrs
+    ) | {ATTR_IO_QUEUE}
+
+
 def make_icon_state_dict(message_icons, icon_names):
     """Extract the icon state for icon_names from message."""
 
     def binary_sensor_value(icon_flag):
         return False if icon_flag is None else bool(icon_flag)
 
-    return {k: binary_sensor_value(message_icons[k]) for k in icon_names}
+    return {k: binary_sensor_value(message_icons.get(k)) for k in icon_names}
 
 
 def init_icon_state_dict(icon_names):
@@ -248,16 +544,294 @@ def init_icon_state_dict(icon_names):
     return {k: False for k in icon_names}
 
 
+# Shared by every RotelDeviceState until the first feedback message arrives
+INITIAL_SPEAKER_ICONS = init_icon_state_dict(SPEAKER_ICON_NAMES)
+INITIAL_STATE_ICONS = init_icon_state_dict(STATE_ICON_NAMES)
+INITIAL_SOUND_MODE_ICONS = init_icon_state_dict(SOUND_MODE_ICON_NAMES)
+INITIAL_INPUT_ICONS = init_icon_state_dict(INPUT_ICON_NAMES)
+INITIAL_MISC_ICONS = init_icon_state_dict(MISC_ICON_NAMES)
+
+
+def changed_icons(prev_flags: bytes, flags: bytes) -> List[Tuple[str, bool]]:
+    """Return (icon, is_on) for each icon whose flag differs between flags."""
+    if prev_flags == flags:
+        return []
+    return [
+        (d.icon, bool(flags[d.flag_index] & d.flag))
+        for d in DISPLAY_ICON_DEFINITIONS
+        if (prev_flags[d.flag_index] ^ flags[d.flag_index]) & d.flag
+    ]
+
+
+def changed_triggers(prev_flags: bytes, flags: bytes) -> List[Tuple[str, int, bool]]:
+    """Return (zone, trigger, is_on) for each trigger that differs between flags."""
+    if prev_flags == flags:
+        return []
+    changes = []
+    for zone_index, zone in enumerate(TRIGGER_ZONE_NAMES):
+        diff = prev_flags[zone_index] ^ flags[zone_index]
+        for bit in range(TRIGGERS_PER_ZONE):
+            if diff & (1 << bit):
+                is_on = bool(flags[zone_index] & (1 << bit))
+                changes.append((zone, bit + 1, is_on))
+    return changes
+
+
+def next_ramp_volume(
+    current: int, target: int, time_remaining: float, step_interval: float
+) -> int:
+    """
+    Return the next device volume on a ramp from current to target.
+
+    The step size is chosen so that the target is reached in time_remaining
+    if each step takes step_interval, so a slow device gets fewer, larger steps.
+    """
+    delta = target - current
+    if delta == 0:
+        return target
+    steps_remaining = max(1, int(time_remaining / step_interval))
+    step = math.ceil(abs(delta) / steps_remaining)
+    return current + step if delta > 0 else current - step
+
+
+def update_feedback_latency(latency: float, sample: float) -> float:
+    """Fold a new feedback latency sample into the moving average."""
+    return (
+        1.0 - FEEDBACK_LATENCY_SMOOTHING
+    ) * latency + FEEDBACK_LATENCY_SMOOTHING * sample
+
+
+def format_profile_summary(
+    profiler: cProfile.Profile, limit: int = PROFILE_SUMMARY_LIMIT
+) -> str:
+    """Return the top functions of a profile, by cumulative time, as text."""
+    profiler.create_stats()
+    if not profiler.stats:
+        return "No messages were handled while profiling\n"
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    return stream.getvalue()
+
+
+def is_profiler_active() -> bool:
+    """Return True if a profiler, e.g. HA's profiler.start, is active."""
+    monitoring = getattr(sys, "monitoring", None)  # Python 3.12+
+    if monitoring is not None:
+        return monitoring.get_tool(monitoring.PROFILER_ID) is not None
+    return sys.getprofile() is not None
+
+
+class RefreshScheduler:
+    """
+    Decide when to send a DISPLAY_REFRESH to confirm the state of the device.
+
+    A refresh is due when no message has been received for the refresh
+    interval.   The interval tightens to min_interval after a command,
+    when a prompt response is expected, and doubles after each refresh
+    up to max_interval so that a device that is quiet, e.g. because it
+    is in standby and doesn't respond, costs very few serial writes.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = MIN_REFRESH_INTERVAL,
+        max_interval: float = MAX_REFRESH_INTERVAL,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.last_confirmed = time.monotonic()
+        self.refreshes = 0
+
+    def confirmed(self, now: float):
+        """Note that a message was received from the device."""
+        self.last_confirmed = now
+
+    def commanded(self, now: float):
+        """Note that a command was sent, so a response should follow soon."""
+        self.interval = self.min_interval
+        self.last_confirmed = now
+
+    def due_in(self, now: float) -> float:
+        """Return the time until a refresh is due, which is <= 0 if it is due."""
+        return self.last_confirmed + self.interval - now
+
+    def refreshed(self, now: float):
+        """Note that a refresh was sent and back off before the next one."""
+        self.refreshes += 1
+        self.last_confirmed = now
+        self.interval = min(2.0 * self.interval, self.max_interval)
+
+
+class CircuitBreaker:
+    """
+    Fail commands fast while the connection to the device is down.
+
+    The breaker opens when the message reader stops or after
+    failure_threshold consecutive write failures.   While it is open,
+    commands are rejected straight away rather than left to hang.
+    After a reconnect it is half open: commands are let through but a
+    single failure opens it again.   It closes once a write succeeds
+    or a message is received.
+    """
+
+    def __init__(
+        self, unique_id: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD
+    ):
+        self.unique_id = unique_id
+        self.failure_threshold = failure_threshold
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.reason: Optional[str] = None
+        # Called with the new state whenever it changes
+        self.listener: Optional[Callable[[str], None]] = None
+
+    def check(self):
+        """Raise HomeAssistantError if the breaker is open."""
+        if self.state == BREAKER_OPEN:
+            raise HomeAssistantError(
+                f"Connection to '{self.unique_id}' is down ({self.reason}).  "
+                f"Call {SERVICE_RECONNECT} to reopen it."
+            )
+
+    def record_success(self):
+        self.failures = 0
+        self._set_state(BREAKER_CLOSED)
+
+    def record_failure(self, reason: str):
+        self.failures += 1
+        if self.state == BREAKER_HALF_OPEN or self.failures >= self.failure_threshold:
+            self.trip(reason)
+
+    def trip(self, reason: str):
+        """Open the breaker."""
+        self.reason = reason
+        self._set_state(BREAKER_OPEN)
+
+    def reset(self):
+        """Let commands through again, on probation, after a reconnect."""
+        if self.state == BREAKER_OPEN:
+            self.failures = 0
+            self._set_state(BREAKER_HALF_OPEN)
+
+    def _set_state(self, state: str):
+        if state == self.state:
+            return
+        _LOGGER.info(
+            "Circuit breaker for '%s' is now %s (was %s)",
+            self.unique_id,
+            state,
+            self.state,
+        )
+        self.state = state
+        if self.listener is not None:
+            self.listener(state)
+
+
+def bypasses_readiness_gate(command: str) -> bool:
+    """Return True for the commands that the device accepts while powering on."""
+    return "POWER" in command or command == "DISPLAY_REFRESH"
+
+
+class ReadinessGate:
+    """
+    Hold commands from power on until the device reports that it is on.
+
+    The device ignores commands for several seconds while it boots so
+    commands sent in that time would be lost.   The gate is armed when
+    the device is powered on and released by the first feedback message
+    that reports it is on, at which point the commands that were held are
+    sent in the order they were issued.   If that takes longer than
+    timeout then the commands are sent anyway.   A timeout of 0 disables
+    the gate.
+    """
+
+    def __init__(self, unique_id: str, timeout: float = DEFAULT_POWER_ON_TIMEOUT):
+        self.unique_id = unique_id
+        self.timeout = timeout
+        # Seconds from power on until ready, the last time it was measured
+        self.time_to_ready: Optional[float] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._armed_at = 0.0
+
+    @property
+    def is_armed(self) -> bool:
+        return self._ready is not None
+
+    def arm(self):
+        if self.timeout > 0 and self._ready is None:
+            self._ready = asyncio.Event()
+            self._armed_at = asyncio.get_running_loop().time()
+
+    def release(self):
+        """Send the commands that are held because the device is ready."""
+        if self._ready is not None:
+            self.time_to_ready = asyncio.get_running_loop().time() - self._armed_at
+            _LOGGER.info(
+                "'%s' was ready %.1fs after power on",
+                self.unique_id,
+                self.time_to_ready,
+            )
+            self.disarm()
+
+    async def async_wait(self):
+        """Wait until the gate is released or times out."""
+        ready = self._ready
+        if ready is None:
+            return
+        try:
+            async with asyncio.timeout_at(self._armed_at + self.timeout):
+                await ready.wait()
+        except TimeoutError:
+            if ready is self._ready:
+                _LOGGER.warning(
+                    "'%s' did not report that it was on within %.1fs of power on",
+                    self.unique_id,
+                    self.timeout,
+                )
+                self.disarm()
+
+    def disarm(self):
+        """Send the commands that are held, without measuring time to ready."""
+        if self._ready is not None:
+            self._ready.set()
+            self._ready = None
+
+
 class RotelConnectionWrapper:
-    def __init__(self, conn: RotelAmpConn, unique_id: str):
+    def __init__(
+        self,
+        conn: RotelAmpConn | ThreadedAmpConn,
+        unique_id: str,
+        breaker: Optional[CircuitBreaker] = None,
+        readiness_gate: Optional[ReadinessGate] = None,
+    ):
         """Wraps device connection to ensure correct management of state"""
         self._unique_id = unique_id
         self._conn = conn
+        # Passed on to the replacement wrapper when reconnecting
+        self.breaker = breaker if breaker is not None else CircuitBreaker(unique_id)
+        self.readiness_gate = (
+            readiness_gate if readiness_gate is not None else ReadinessGate(unique_id)
+        )
+        self._feedback_waiters: Dict[asyncio.Future, Callable[[], bool]] = {}
+        self._message_handler: Callable[[AnyMessage], None] = lambda message: None
+        # Set while a profile is being taken; None costs nothing per message
+        self.profiler: Optional[cProfile.Profile] = None
+        self.refresh_scheduler = RefreshScheduler()
 
     @property
     def meta(self) -> RotelModelMeta:
         return self._conn.meta
 
+    @property
+    def io_queue_stats(self) -> Optional[IoQueueStats]:
+        """Return the I/O queue measurements if the I/O thread is in use."""
+        if isinstance(self._conn, ThreadedAmpConn):
+            return self._conn.stats
+        return None
+
     async def async_open(self):
         """Open a connection to the device."""
         await self._conn.open()
@@ -276,26 +850,168 @@ class RotelConnectionWrapper:
         Send a DISPLAY_REFRESH command before we start reading.
         If the device is already on then this is a null command that will
         simply trigger a feedback message that will sync the state of this
-        object with the physical device.
+        object with the physical device.   After that, further refreshes
+        are sent as the refresh_scheduler decides.
+
+        The circuit breaker is opened if the reader stops for any reason
+        other than being cancelled.
         """
         assert self._conn is not None
+        self._message_handler = message_handler
+        scheduler = self.refresh_scheduler
+        breaker = self.breaker
+        refresh_task = None
         try:
             await self.async_send_command("DISPLAY_REFRESH")
+            refresh_task = asyncio.create_task(self._async_refresh_when_stale())
             async for message in self._conn.read_messages():
                 _LOGGER.debug("Message received by %s.", self._unique_id)
-                message_handler(message)
+                scheduler.confirmed(time.monotonic())
+                if breaker.state != BREAKER_CLOSED:
+                    breaker.record_success()
+                if self.profiler is None:
+                    self._handle_message(message)
+                else:
+                    self._handle_message_profiled(message, self.profiler)
         except asyncio.CancelledError:
             _LOGGER.info("Message reader cancelled for %s", self._unique_id)
+        except Exception as err:
+            breaker.trip(f"reader failed: {err!r}")
+            raise
+        else:
+            _LOGGER.warning("Connection to %s was closed", self._unique_id)
+            breaker.trip("connection closed")
+        finally:
+            if refresh_task is not None:
+                refresh_task.cancel()
+
+    async def _async_refresh_when_stale(self):
+        """Send a DISPLAY_REFRESH whenever the state has gone unconfirmed too long."""
+        scheduler = self.refresh_scheduler
+        while True:
+            # Messages move the due time on, so check again after sleeping
+            delay = scheduler.due_in(time.monotonic())
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            scheduler.refreshed(time.monotonic())
+            _LOGGER.debug("Refreshing stale state of %s", self._unique_id)
+            try:
+                await self._async_write(self._conn.send_command("DISPLAY_REFRESH"))
+            except HomeAssistantError as err:
+                _LOGGER.warning("Could not refresh %s: %s", self._unique_id, err)
+
+    def set_message_handler(self, message_handler: Callable[[AnyMessage], None]):
+        """Hand the messages from a running reader to a different handler."""
+        self._message_handler = message_handler
+
+    def _handle_message_profiled(
+        self, message: AnyMessage, profiler: cProfile.Profile
+    ) -> None:
+        """
+        Handle a message with profiler enabled.
+
+        If another profiler has become active then the profile is abandoned
+        rather than fail, on Python 3.12+, or silently stop the other one.
+        """
+        try:
+            if is_profiler_active():
+                raise ValueError("Another profiling tool is already active")
+            profiler.enable()
+        except ValueError as err:
+            _LOGGER.warning("Stopped profiling %s: %s", self._unique_id, err)
+            self.profiler = None
+            self._handle_message(message)
+            return
+        try:
+            self._handle_message(message)
+        finally:
+            profiler.disable()
+
+    def _handle_message(self, message: AnyMessage) -> None:
+        self._message_handler(message)
+        if self._feedback_waiters and isinstance(message, FeedbackMessage):
+            self._resolve_feedback_waiters()
 
     async def async_send_command(self, command: str) -> None:
         assert self._conn is not None
-        await self._conn.send_command(command)
+        self.breaker.check()
+        if not bypasses_readiness_gate(command):
+            await self.readiness_gate.async_wait()
+        self.refresh_scheduler.commanded(time.monotonic())
+        await self._async_write(self._conn.send_command(command))
 
     async def async_send_volume_direct_command(
         self, zone: int, device_volume: int
     ) -> None:
         assert self._conn is not None
-        await self._conn.send_volume_direct_command(zone, device_volume)
+        self.breaker.check()
+        await self.readiness_gate.async_wait()
+        self.refresh_scheduler.commanded(time.monotonic())
+        await self._async_write(
+            self._conn.send_volume_direct_command(zone, device_volume)
+        )
+
+    async def _async_write(self, write: Awaitable[None]) -> None:
+        """Await a write to the device and record the outcome in the breaker."""
+        try:
+            async with asyncio.timeout(WRITE_TIMEOUT):
+                await write
+        except OSError as err:  # Includes TimeoutError
+            self.breaker.record_failure(f"write failed: {err!r}")
+            raise HomeAssistantError(
+                f"Could not write to '{self._unique_id}': {err!r}"
+            ) from err
+        self.breaker.record_success()
+
+    async def async_send_command_confirmed(
+        self, command: str, is_confirmed: Callable[[], bool], absolute: bool = False
+    ) -> asyncio.Future:
+        """
+        Send a command and return a future for its confirmation.
+
+        The future resolves once a feedback message has been handled
+        after which is_confirmed() returns True.   If the command sets an
+        absolute state, such as POWER_ON, then it resolves as soon as it
+        is sent if is_confirmed() already returns True because the device
+        may not send any feedback when nothing changes.
+        """
+        return await self._async_send_confirmed(
+            self.async_send_command(command), is_confirmed, absolute
+        )
+
+    async def async_send_volume_direct_command_confirmed(
+        self, zone: int, device_volume: int, is_confirmed: Callable[[], bool]
+    ) -> asyncio.Future:
+        """Send a volume direct command and return a future for its confirmation."""
+        return await self._async_send_confirmed(
+            self.async_send_volume_direct_command(zone, device_volume), is_confirmed
+        )
+
+    async def _async_send_confirmed(
+        self,
+        send: Awaitable[None],
+        is_confirmed: Callable[[], bool],
+        absolute: bool = False,
+    ) -> asyncio.Future:
+        # Register before sending so that a prompt response can't be missed
+        waiter = asyncio.get_running_loop().create_future()
+        self._feedback_waiters[waiter] = is_confirmed
+        waiter.add_done_callback(self._feedback_waiters.pop)
+        try:
+            await send
+        except BaseException:
+            waiter.cancel()
+            raise
+        if absolute and not waiter.done() and is_confirmed():
+            waiter.set_result(None)
+        return waiter
+
+    def _resolve_feedback_waiters(self):
+        """Resolve the waiters that are confirmed by the latest feedback message."""
+        for waiter, is_confirmed in list(self._feedback_waiters.items()):
+            if not waiter.done() and is_confirmed():
+                waiter.set_result(None)
 
 
 @dataclass
@@ -303,10 +1019,19 @@ class RotelConnectionWrapperFactory:
     serial_port: str
     unique_id: str
     meta: RotelModelMeta
+    io_thread: bool = False
 
-    def make_conn(self) -> RotelConnectionWrapper:
-        conn = RotelAmpConn(self.serial_port, self.meta)
-        return RotelConnectionWrapper(conn, self.unique_id)
+    def make_conn(
+        self,
+        breaker: Optional[CircuitBreaker] = None,
+        readiness_gate: Optional[ReadinessGate] = None,
+    ) -> RotelConnectionWrapper:
+        conn: RotelAmpConn | ThreadedAmpConn
+        if self.io_thread:
+            conn = ThreadedAmpConn(self.serial_port, self.meta)
+        else:
+            conn = RotelAmpConn(self.serial_port, self.meta)
+        return RotelConnectionWrapper(conn, self.unique_id, breaker, readiness_gate)
 
 
 def make_smart_display_lines(
@@ -319,16 +1044,303 @@ def make_smart_display_lines(
         lines = prev_lines.copy()
 
     for lineno, line in enumerate(message.lines, message.start):
-        if lineno <= 10:
+        if 1 <= lineno <= 10:
             lines[lineno - 1] = line
 
     return lines
 
 
+@dataclass(frozen=True, slots=True)
+class RotelDeviceState:
+    """
+    Immutable snapshot of the state decoded from device messages.
+
+    Each message produces a new snapshot but anything that the message
+    didn't change is shared with the previous snapshot rather than rebuilt.
+    The dicts and lists held here are therefore shared and must not be mutated.
+    """
+
+    is_on: bool = False
+    source: Optional[str] = None
+    device_volume: Optional[int] = None  # Raw volume level from the device
+    is_volume_muted: Optional[bool] = None
+    party_mode_on: Optional[bool] = None
+    info: Optional[str] = None
+    icon_flags: Optional[bytes] = None
+    icons: Optional[List[str]] = None
+    speaker_icons: Dict[str, bool] = field(
+        default_factory=lambda: INITIAL_SPEAKER_ICONS
+    )
+    state_icons: Dict[str, bool] = field(default_factory=lambda: INITIAL_STATE_ICONS)
+    sound_mode_icons: Dict[str, bool] = field(
+        default_factory=lambda: INITIAL_SOUND_MODE_ICONS
+    )
+    input_icons: Dict[str, bool] = field(default_factory=lambda: INITIAL_INPUT_ICONS)
+    misc_icons: Dict[str, bool] = field(default_factory=lambda: INITIAL_MISC_ICONS)
+    trigger_flags: Optional[bytes] = None
+    triggers: Optional[List[list]] = None
+    smart_display: Optional[List[str]] = None
+
+
+def update_device_state(prev: RotelDeviceState, **changes) -> RotelDeviceState:
+    """Return prev updated with changes, or prev itself if nothing changed."""
+    for name, value in changes.items():
+        if getattr(prev, name) != value:
+            return replace(prev, **changes)
+    return prev
+
+
+def share_if_equal(prev_value, value):
+    """Return prev_value if it equals value so that the old object is shared."""
+    return prev_value if prev_value == value else value
+
+
+# Attribute group, RotelDeviceState field and icon names for each icon state dict
+ICON_STATE_GROUPS = (
+    ("speaker", "speaker_icons", SPEAKER_ICON_NAMES),
+    ("state", "state_icons", STATE_ICON_NAMES),
+    ("sound_mode", "sound_mode_icons", SOUND_MODE_ICON_NAMES),
+    ("input", "input_icons", INPUT_ICON_NAMES),
+    ("misc", "misc_icons", MISC_ICON_NAMES),
+)
+
+
+def decode_feedback_message(
+    prev: RotelDeviceState,
+    message: FeedbackMessage,
+    attribute_groups: frozenset[str] = frozenset(ATTRIBUTE_GROUPS),
+) -> RotelDeviceState:
+    """
+    Decode a feedback message into a new RotelDeviceState.
+
+    The icon state is only rebuilt when the icon flags have changed
+    and only for the icon groups in attribute_groups.
+    Raises ValueError if the display lines can't be parsed.
+    """
+    fields = message.parse_display_lines()
+    changes = {
+        "is_on": bool(fields["is_on"]),
+        "source": fields["source_name"],
+        "device_volume": fields["volume"],
+        "is_volume_muted": fields["mute_on"],
+        "party_mode_on": fields["party_mode_on"],
+        "info": fields["info"],
+    }
+    flags = bytes(message.flags)
+    if flags != prev.icon_flags:
+        changes["icon_flags"] = flags
+        if "icons" in attribute_groups:
+            changes["icons"] = share_if_equal(prev.icons, message.icons_that_are_on())
+        for group, name, icon_names in ICON_STATE_GROUPS:
+            if group in attribute_groups:
+                changes[name] = share_if_equal(
+                    getattr(prev, name), make_icon_state_dict(message.icons, icon_names)
+                )
+    return update_device_state(prev, **changes)
+
+
+# The RotelDeviceState fields that are published whatever the attribute groups
+PUBLISHED_FIELDS = (
+    "is_on",
+    "source",
+    "device_volume",
+    "is_volume_muted",
+    "party_mode_on",
+    "info",
+)
+
+
+def is_published_change(
+    prev: RotelDeviceState,
+    device_state: RotelDeviceState,
+    group_attributes: Tuple[str, ...],
+) -> bool:
+    """
+    Return True if device_state differs from prev in anything that is published.
+
+    Changes to the raw flags or to attribute groups that aren't published
+    don't count.   Unchanged values are usually shared so they are compared
+    by identity before equality.
+    """
+    if device_state is prev:
+        return False
+    for name in PUBLISHED_FIELDS + group_attributes:
+        prev_value = getattr(prev, name)
+        value = getattr(device_state, name)
+        if prev_value is not value and prev_value != value:
+            return True
+    return False
+
+
+@dataclass(frozen=True)
+class RestoreCommand:
+    """A command name to send or, if device_volume is set, a direct volume command."""
+
+    command_name: Optional[str] = None
+    device_volume: Optional[int] = None
+
+
+def plan_restore_commands(
+    current: RotelDeviceState,
+    saved: RotelDeviceState,
+    source_map: Dict[str, str],
+) -> List[RestoreCommand]:
+    """
+    Return the fewest commands that take the device from current to saved.
+
+    Anything that already matches is skipped.   If the device has to be
+    turned on then POWER_ON is the only command returned because the
+    rest of the state isn't known until the device reports it, so plan
+    again once the device is on.
+    """
+    if not saved.is_on:
+        return [RestoreCommand("POWER_OFF")] if current.is_on else []
+    if not current.is_on:
+        return [RestoreCommand("POWER_ON")]
+
+    commands = []
+    if saved.source is not None and saved.source != current.source:
+        if saved.source in source_map:
+            commands.append(RestoreCommand(source_map[saved.source]))
+        else:
+            _LOGGER.debug("Can't restore unknown source %r", saved.source)
+    # Unmute before and mute after setting the volume so that the
+    # change of volume can't undo the change of mute
+    if saved.is_volume_muted is False and current.is_volume_muted is not False:
+        commands.append(RestoreCommand("MAIN_ZONE_MUTE_OFF"))
+    if saved.device_volume is not None and saved.device_volume != current.device_volume:
+        commands.append(RestoreCommand(device_volume=saved.device_volume))
+    if saved.is_volume_muted is True and current.is_volume_muted is not True:
+        commands.append(RestoreCommand("MAIN_ZONE_MUTE_ON"))
+    return commands
+
+
+def decode_trigger_message(
+    prev: RotelDeviceState, message: TriggerMessage
+) -> RotelDeviceState:
+    """Decode a trigger message into a new RotelDeviceState."""
+    flags = bytes(message.flags)
+    if flags == prev.trigger_flags:
+        return prev
+    return replace(prev, trigger_flags=flags, triggers=message.flags_to_list(flags))
+
+
+def decode_smart_display_message(
+    prev: RotelDeviceState, message: SmartDisplayMessage
+) -> RotelDeviceState:
+    """Decode a smart display message into a new RotelDeviceState."""
+    lines = make_smart_display_lines(prev.smart_display, message)
+    return update_device_state(prev, smart_display=lines)
+
+
+class ParkedConnection:
+    """
+    An open connection and running reader that outlive their entity.
+
+    When an entity is removed while HA is running, e.g. by a reload, its
+    connection is parked so that the entity that replaces it can adopt
+    it rather than reopen the port and wait for a DISPLAY_REFRESH.
+    Unless it is adopted within PARK_TIMEOUT, or before HA stops, it is
+    closed.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        unique_id: str,
+        conn_factory: RotelConnectionWrapperFactory,
+        conn: RotelConnectionWrapper,
+        read_messages_task: asyncio.Task,
+        device_state: RotelDeviceState,
+        attribute_groups: frozenset[str],
+    ):
+        self.hass = hass
+        self.unique_id = unique_id
+        self.conn_factory = conn_factory
+        self.conn = conn
+        self.read_messages_task = read_messages_task
+        self.device_state = device_state
+        self.attribute_groups = attribute_groups
+        self.messages: deque = deque(maxlen=MAX_PARKED_MESSAGES)
+        self._cancel_timeout: Optional[CALLBACK_TYPE] = None
+        self._cancel_stop_listener: Optional[CALLBACK_TYPE] = None
+
+    def park(self):
+        """Keep the connection until it is adopted, PARK_TIMEOUT expires or HA stops."""
+        parked = self.hass.data.setdefault(DATA_PARKED_CONNECTIONS, {})
+        assert self.unique_id not in parked
+        parked[self.unique_id] = self
+        self.conn.set_message_handler(self.messages.append)
+        self._cancel_timeout = async_call_later(
+            self.hass, PARK_TIMEOUT, self._async_handle_timeout
+        )
+        # The stop listener of the entity that parked it has gone with it
+        self._cancel_stop_listener = self.hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STOP, self._async_handle_stop
+        )
+
+    def unpark(self):
+        """Stop the timeout and remove the connection from the parked connections."""
+        if self._cancel_timeout is not None:
+            self._cancel_timeout()
+            self._cancel_timeout = None
+        if self._cancel_stop_listener is not None:
+            self._cancel_stop_listener()
+            self._cancel_stop_listener = None
+        self.hass.data[DATA_PARKED_CONNECTIONS].pop(self.unique_id, None)
+
+    @staticmethod
+    def unpark_for(
+        hass: HomeAssistant, unique_id: Optional[str]
+    ) -> Optional["ParkedConnection"]:
+        parked = hass.data.get(DATA_PARKED_CONNECTIONS, {}).get(unique_id)
+        if parked is not None:
+            parked.unpark()
+        return parked
+
+    @staticmethod
+    async def async_close_for_port(hass: HomeAssistant, serial_port: str):
+        """
+        Close any parked connection to serial_port.
+
+        It may belong to an entity whose unique_id has changed and it has
+        to be closed before the port can be opened again.
+        """
+        parked_connections = hass.data.get(DATA_PARKED_CONNECTIONS, {})
+        for parked in list(parked_connections.values()):
+            if parked.conn_factory.serial_port == serial_port:
+                _LOGGER.info("Closing parked connection for '%s'", parked.unique_id)
+                await parked.async_close()
+
+    async def async_close(self):
+        """Stop the reader and close the connection."""
+        self.unpark()
+        if not self.read_messages_task.done():
+            self.read_messages_task.cancel()
+            try:
+                await self.read_messages_task
+            except asyncio.CancelledError:
+                pass
+        await self.conn.async_close()
+
+    async def _async_handle_timeout(self, now):
+        # pylint: disable=unused-argument
+        self._cancel_timeout = None
+        _LOGGER.info("Closing parked connection for '%s'", self.unique_id)
+        await self.async_close()
+
+    async def _async_handle_stop(self, event):
+        # pylint: disable=unused-argument
+        self._cancel_stop_listener = None
+        _LOGGER.info("Closing parked connection for '%s'", self.unique_id)
+        await self.async_close()
+
+
 class RotelMediaPlayer(MediaPlayerEntity):
     """Representation of a Rotel media player."""
 
     _attr_device_class = MediaPlayerDeviceClass.RECEIVER
+    _unrecorded_attributes = unrecorded_attributes([])
     _attr_supported_features = (
         MediaPlayerEntityFeature.VOLUME_SET
         | MediaPlayerEntityFeature.VOLUME_STEP
@@ -348,13 +1360,39 @@ class RotelMediaPlayer(MediaPlayerEntity):
         name: str,
         conn_factory: RotelConnectionWrapperFactory,
         source_map: Dict[str, str],
+        attribute_groups: frozenset[str] = frozenset(ATTRIBUTE_GROUPS),
+        mqtt_topic: Optional[str] = None,
+        power_on_timeout: float = DEFAULT_POWER_ON_TIMEOUT,
     ):
         """Initialize the device."""
         self._conn_factory = conn_factory
-        self._conn = self._conn_factory.make_conn()
+        self._power_on_timeout = power_on_timeout
+        self._conn = self._conn_factory.make_conn(
+            readiness_gate=ReadinessGate(unique_id, power_on_timeout)
+        )
         self._source_map = source_map
+        self._attribute_groups = attribute_groups
+        # The attributes are named after the RotelDeviceState fields
+        self._group_attributes = tuple(
+            attr
+            for group, attrs in ATTRIBUTE_GROUPS.items()
+            if group in attribute_groups
+            for attr in attrs
+        )
+
+        self._mqtt_topic = mqtt_topic
+        self._mqtt_bridge: Optional[RotelMqttBridge] = None
 
         self._read_messages_task = None
+        self._volume_ramp_task: Optional[asyncio.Task] = None
+        # The volume that the volume up and down presses so far add up to
+        self._volume_step_target: Optional[int] = None
+        self._volume_step_task: Optional[asyncio.Task] = None
+        self._profiler: Optional[cProfile.Profile] = None
+        self._snapshot: Optional[RotelDeviceState] = None
+        self._feedback_latency = INITIAL_FEEDBACK_LATENCY
+        # Count of messages that changed nothing published so weren't written
+        self.skipped_state_writes = 0
 
         self._attr_has_entity_name = True
         self._attr_name = name
@@ -362,27 +1400,30 @@ class RotelMediaPlayer(MediaPlayerEntity):
         self._attr_should_poll = False
         self._attr_assumed_state = True
         self._attr_source_list = sorted(self._source_map.keys())
-        self._attr_source = None
-        self._attr_state = MediaPlayerState.OFF
-        self._attr_volume_level = None
-        self._attr_is_volume_muted = None
-
-        self._device_volume = None  # Raw volume level from the device
-        self._party_mode_on = None
-        self._info = None
-        self._icons = None
-        self._speaker_icons = init_icon_state_dict(SPEAKER_ICON_NAMES)
-        self._state_icons = init_icon_state_dict(STATE_ICON_NAMES)
-        self._sound_mode_icons = init_icon_state_dict(SOUND_MODE_ICON_NAMES)
-        self._input_icons = init_icon_state_dict(INPUT_ICON_NAMES)
-        self._misc_icons = init_icon_state_dict(MISC_ICON_NAMES)
-        self._triggers = None
-        self._smart_display: Optional[List[str]] = None
+        self._set_device_state(RotelDeviceState())
+
+    @property
+    def serial_port(self) -> str:
+        return self._conn_factory.serial_port
 
     async def async_added_to_hass(self):
         """Open connection and set up remove event when entity added to hass."""
-        await self._conn.async_open()
-        self._start_read_messages()
+        parked = ParkedConnection.unpark_for(self.hass, self.unique_id)
+        if (
+            parked is not None
+            and parked.conn_factory == self._conn_factory
+            and not parked.read_messages_task.done()
+        ):
+            self._adopt(parked)
+        else:
+            if parked is not None:
+                await parked.async_close()
+            await ParkedConnection.async_close_for_port(self.hass, self.serial_port)
+            await self._conn.async_open()
+            self._start_read_messages()
+        self._conn.breaker.listener = self._handle_breaker_change
+        if self._mqtt_topic is not None:
+            self._start_mqtt_bridge(self._mqtt_topic)
 
         async def handle_hass_stop_event(event):
             """Clean up when hass stops."""
@@ -396,10 +1437,76 @@ class RotelMediaPlayer(MediaPlayerEntity):
 
     async def async_will_remove_from_hass(self) -> None:
         """Run when entity will be removed from hass."""
-        await self.cleanup()
+        self._conn.breaker.listener = None
+        if self._mqtt_bridge is not None:
+            self._mqtt_bridge.stop()
+            self._mqtt_bridge = None
+        if (
+            self.hass.is_stopping
+            or self._read_messages_task is None
+            or self._read_messages_task.done()
+        ):
+            await self.cleanup()
+            return
+        # Could be a reload so keep the connection open for the new entity
+        _LOGGER.info("Parking connection for '%s'", self.unique_id)
+        await self._cancel_volume_ramp()
+        await self._cancel_volume_steps()
+        self._conn.profiler = None
+        ParkedConnection(
+            self.hass,
+            self.unique_id,
+            self._conn_factory,
+            self._conn,
+            self._read_messages_task,
+            self._device_state,
+            self._attribute_groups,
+        ).park()
+        self._read_messages_task = None
+
+    def _adopt(self, parked: ParkedConnection):
+        """Take over a parked connection and the state decoded from it."""
+        _LOGGER.info("Adopting parked connection for '%s'", self.unique_id)
+        self._conn = parked.conn
+        self._conn.readiness_gate.timeout = self._power_on_timeout
+        self._read_messages_task = parked.read_messages_task
+        device_state = parked.device_state
+        if parked.attribute_groups != self._attribute_groups:
+            # Icons are only decoded when the flags change so forget them
+            device_state = replace(device_state, icon_flags=None)
+        self._set_device_state(device_state)
+        self._conn.set_message_handler(self.handle_message)
+        for message in parked.messages:
+            self.handle_message(message)
+        if device_state.icon_flags is None:
+            self.hass.async_create_task(
+                self._conn.async_send_command("DISPLAY_REFRESH")
+            )
+
+    def _start_mqtt_bridge(self, base_topic: str):
+        """Publish the device state to MQTT and accept commands from it."""
+        topics = {"device": PUBLISHED_FIELDS}
+        for group, attrs in ATTRIBUTE_GROUPS.items():
+            if group in self._attribute_groups:
+                topics[group] = attrs
+        self._mqtt_bridge = RotelMqttBridge(
+            self.hass,
+            base_topic,
+            topics,
+            self._conn.meta.messages,
+            self.async_send_command,
+        )
+        self._mqtt_bridge.publish(self._device_state)
+        self._mqtt_bridge.start()
+
+    def _handle_breaker_change(self, state: str):
+        # pylint: disable=unused-argument
+        self.async_schedule_update_ha_state()
 
     def _start_read_messages(self):
         """Create a task to start reading messages."""
+        # Carry a profile in progress over to a new connection
+        self._conn.profiler = self._profiler
         self._read_messages_task = self.hass.loop.create_task(
             self._conn.async_read_messages(self.handle_message)
         )
@@ -444,20 +1551,25 @@ class RotelMediaPlayer(MediaPlayerEntity):
         # Set the state to OFF by default
         # If the player is actually on then the state will be refreshed
         # when the message reader restarts
-        self._attr_state = MediaPlayerState.OFF
+        self._set_device_state(replace(self._device_state, is_on=False))
         self.async_schedule_update_ha_state()
 
         # Replace the old connection object
         # Not strictly necessary but better safe than sorry
-        self._conn = self._conn_factory.make_conn()
+        self._conn = self._conn_factory.make_conn(
+            self._conn.breaker, self._conn.readiness_gate
+        )
 
         # Open the connection
         await self._conn.async_open()
+        self._conn.breaker.reset()
         self._start_read_messages()
 
     async def cleanup(self):
         """Close connection and stop message reader."""
         _LOGGER.info("Cleaning up '%s'", self.unique_id)
+        await self._cancel_volume_ramp()
+        await self._cancel_volume_steps()
         await self._cancel_read_messages()
         await self._conn.async_close()
         _LOGGER.info("Finished cleaning up '%s'", self.unique_id)
@@ -479,47 +1591,104 @@ class RotelMediaPlayer(MediaPlayerEntity):
             return None
         return device_volume / self._conn.meta.max_volume
 
-    def handle_feedback_message(self, message: FeedbackMessage):
-        """Map feedback message to object attributes."""
-        fields = message.parse_display_lines()
+    def _set_device_state(self, device_state: RotelDeviceState):
+        """Make device_state the current state and map it to entity attributes."""
+        self._device_state = device_state
         self._attr_state = (
-            MediaPlayerState.ON if fields["is_on"] else MediaPlayerState.OFF
+            MediaPlayerState.ON if device_state.is_on else MediaPlayerState.OFF
         )
-        self._attr_source = fields["source_name"]
-        self._device_volume = fields["volume"]
-        self._attr_volume_level = self.device_vol_to_vol_level(self._device_volume)
-        self._attr_is_volume_muted = fields["mute_on"]
-        self._party_mode_on = fields["party_mode_on"]
-        self._info = fields["info"]
-        self._icons = message.icons_that_are_on()
-        self._speaker_icons = make_icon_state_dict(message.icons, SPEAKER_ICON_NAMES)
-        self._state_icons = make_icon_state_dict(message.icons, STATE_ICON_NAMES)
-        self._sound_mode_icons = make_icon_state_dict(
-            message.icons, SOUND_MODE_ICON_NAMES
+        self._attr_source = device_state.source
+        self._attr_volume_level = self.device_vol_to_vol_level(
+            device_state.device_volume
         )
-        self._input_icons = make_icon_state_dict(message.icons, INPUT_ICON_NAMES)
-        self._misc_icons = make_icon_state_dict(message.icons, MISC_ICON_NAMES)
-        self.async_schedule_update_ha_state()
+        self._attr_is_volume_muted = device_state.is_volume_muted
+
+    def handle_feedback_message(self, message: FeedbackMessage):
+        """Map feedback message to object attributes."""
+        prev = self._device_state
+        try:
+            device_state = decode_feedback_message(
+                prev, message, self._attribute_groups
+            )
+        except ValueError:
+            _LOGGER.error("Discarding unparseable feedback message: %r", message.lines)
+            return
+        if device_state.is_on and self._conn.readiness_gate.is_armed:
+            self._conn.readiness_gate.release()
+        if "icons" in self._attribute_groups:
+            self._fire_icon_events(prev.icon_flags, device_state.icon_flags)
+        self._publish_device_state(device_state)
 
     def handle_trigger_message(self, message: TriggerMessage):
         """Map trigger message to object attributes."""
-        self._triggers = message.flags_to_list(message.flags)
-        self.async_schedule_update_ha_state()
+        if "triggers" not in self._attribute_groups:
+            return
+        prev = self._device_state
+        device_state = decode_trigger_message(prev, message)
+        if prev.trigger_flags is not None and device_state is not prev:
+            for zone, trigger, is_on in changed_triggers(
+                prev.trigger_flags, device_state.trigger_flags
+            ):
+                self.hass.bus.async_fire(
+                    EVENT_TRIGGER_CHANGED,
+                    {
+                        ATTR_ENTITY_ID: self.entity_id,
+                        ATTR_ZONE: zone,
+                        ATTR_TRIGGER: trigger,
+                        ATTR_STATE: "on" if is_on else "off",
+                    },
+                )
+        self._publish_device_state(device_state)
+
+    def _fire_icon_events(self, prev_flags: Optional[bytes], flags: Optional[bytes]):
+        """Fire an event for each icon that has changed since the last message."""
+        if prev_flags is not None and flags is not None:
+            for icon, is_on in changed_icons(prev_flags, flags):
+                self.hass.bus.async_fire(
+                    EVENT_ICON_CHANGED,
+                    {
+                        ATTR_ENTITY_ID: self.entity_id,
+                        ATTR_ICON: icon,
+                        ATTR_STATE: "on" if is_on else "off",
+                    },
+                )
 
     def handle_smart_display_message(self, message: SmartDisplayMessage):
         """Map smart display message to object attributes."""
-        self._smart_display = make_smart_display_lines(self._smart_display, message)
-        self.async_schedule_update_ha_state()
+        if "smart_display" not in self._attribute_groups:
+            return
+        self._publish_device_state(
+            decode_smart_display_message(self._device_state, message)
+        )
+
+    def _publish_device_state(self, device_state: RotelDeviceState):
+        """Set the device state and write it to HA if anything published changed."""
+        prev = self._device_state
+        self._set_device_state(device_state)
+        if is_published_change(prev, device_state, self._group_attributes):
+            self.async_schedule_update_ha_state()
+        else:
+            self.skipped_state_writes += 1
+        if self._mqtt_bridge is not None:
+            self._mqtt_bridge.publish(device_state)
 
     async def async_turn_on(self):
         """Turn the media player on."""
-        await self.async_send_command("POWER_ON")
-        self._attr_state = MediaPlayerState.ON
+        if not self._device_state.is_on:
+            # Hold any commands that follow until the device has booted
+            self._conn.readiness_gate.arm()
+        try:
+            await self.async_send_command("POWER_ON")
+        except BaseException:
+            self._conn.readiness_gate.disarm()
+            raise
+        self._set_device_state(replace(self._device_state, is_on=True))
 
     async def async_turn_off(self):
         """Turn off media player."""
+        self._conn.readiness_gate.disarm()
         await self.async_send_command("POWER_OFF")
-        self._attr_state = MediaPlayerState.OFF
+        self._set_device_state(replace(self._device_state, is_on=False))
 
     async def async_select_source(self, source):
         """Select input source."""
@@ -527,11 +1696,39 @@ class RotelMediaPlayer(MediaPlayerEntity):
 
     async def async_volume_up(self):
         """Volume up media player."""
-        await self.async_send_command("VOLUME_UP")
+        await self._async_step_volume(1, "VOLUME_UP")
 
     async def async_volume_down(self):
         """Volume down media player."""
-        await self.async_send_command("VOLUME_DOWN")
+        await self._async_step_volume(-1, "VOLUME_DOWN")
+
+    async def _async_step_volume(self, step: int, command_name: str):
+        """
+        Add a volume step to those that will be sent as one direct volume command.
+
+        Steps are added up, starting from the last known device volume,
+        for VOLUME_STEP_WINDOW so that a burst of presses costs one command
+        and one feedback message rather than one of each per press.
+        """
+        # Fail every press, not just the first of a burst, while the
+        # connection is down
+        self._conn.breaker.check()
+        if self._volume_step_target is None:
+            current = self._device_state.device_volume
+            if current is None:
+                # Don't know where we are starting from so let the device step
+                await self.async_send_command(command_name)
+                return
+            await self._cancel_volume_ramp()
+            self._volume_step_target = current
+        meta = self._conn.meta
+        self._volume_step_target = max(
+            meta.min_volume, min(meta.max_volume, self._volume_step_target + step)
+        )
+        if self._volume_step_task is None:
+            self._volume_step_task = self.hass.async_create_task(
+                self._async_run_volume_steps()
+            )
 
     async def async_mute_volume(self, mute):
         """Mute (true) or unmute (false) media player."""
@@ -550,26 +1747,304 @@ class RotelMediaPlayer(MediaPlayerEntity):
     @property
     def extra_state_attributes(self):
         """Return device specific state attributes."""
-        return {
-            ATTR_DISPLAY_VOLUME: self._device_volume,
-            ATTR_PARTY_MODE_ON: self._party_mode_on,
-            ATTR_INFO: self._info,
-            ATTR_ICONS: self._icons,
-            ATTR_SPEAKER_ICONS: self._speaker_icons,
-            ATTR_STATE_ICONS: self._state_icons,
-            ATTR_INPUT_ICONS: self._input_icons,
-            ATTR_SOUND_MODE_ICONS: self._sound_mode_icons,
-            ATTR_MISC_ICONS: self._misc_icons,
-            ATTR_TRIGGERS: self._triggers,
-            ATTR_SMART_DISPLAY: self._smart_display,
+        device_state = self._device_state
+        attributes = {
+            ATTR_DISPLAY_VOLUME: device_state.device_volume,
+            ATTR_PARTY_MODE_ON: device_state.party_mode_on,
+            ATTR_INFO: device_state.info,
+            ATTR_CIRCUIT_BREAKER: self._conn.breaker.state,
         }
+        for attr in self._group_attributes:
+            attributes[attr] = getattr(device_state, attr)
+        io_queue_stats = self._conn.io_queue_stats
+        if io_queue_stats is not None:
+            attributes[ATTR_IO_QUEUE] = io_queue_stats.as_dict()
+        time_to_ready = self._conn.readiness_gate.time_to_ready
+        if time_to_ready is not None:
+            attributes[ATTR_TIME_TO_READY] = round(time_to_ready, 2)
+        return attributes
 
     async def async_set_volume_level(self, volume: float):
         """Set volume level, range 0..1."""
         scaled_volume: int = round(volume * self._conn.meta.max_volume)
         _LOGGER.debug("Set volume to: %r", scaled_volume)
+        await self._cancel_volume_ramp()
+        await self._cancel_volume_steps()
         await self._conn.async_send_volume_direct_command(1, scaled_volume)
 
     async def async_send_command(self, command_name: str):
         """Send a command to the device."""
         await self._conn.async_send_command(command_name)
+
+    async def async_send_command_and_confirm(self, command_name: str, timeout: float):
+        """
+        Send a command to the device and wait for feedback that confirms it.
+
+        Raises HomeAssistantError if there is no confirmation within timeout.
+        """
+        is_confirmed, absolute = self._command_confirmation(command_name)
+        waiter = await self._conn.async_send_command_confirmed(
+            command_name, is_confirmed, absolute
+        )
+        try:
+            async with asyncio.timeout(timeout):
+                await waiter
+        except TimeoutError as err:
+            raise HomeAssistantError(
+                f"{self.entity_id} did not confirm {command_name} within {timeout}s"
+            ) from err
+
+    def _command_confirmation(
+        self, command_name: str
+    ) -> Tuple[Callable[[], bool], bool]:
+        """
+        Return a function that tells whether the state reflects command_name.
+
+        Also return whether command_name sets an absolute state, in which
+        case it is already confirmed if the state already reflects it.
+        Toggles and commands with no recognisable effect on the state are
+        confirmed by the next feedback message.
+        """
+        prev = self._device_state
+        if command_name in ("POWER_ON", "MAIN_ZONE_POWER_ON"):
+            return lambda: self._device_state.is_on, True
+        if command_name in ("POWER_OFF", "MAIN_ZONE_POWER_OFF", "POWER_OFF_ALL_ZONES"):
+            return lambda: not self._device_state.is_on, True
+        if command_name in ("POWER_TOGGLE", "MAIN_ZONE_POWER_TOGGLE"):
+            return lambda: self._device_state.is_on != prev.is_on, False
+        if command_name == "MAIN_ZONE_MUTE_ON":
+            return lambda: self._device_state.is_volume_muted is True, True
+        if command_name == "MAIN_ZONE_MUTE_OFF":
+            return lambda: self._device_state.is_volume_muted is False, True
+        if (
+            command_name in ("MUTE_TOGGLE", "MAIN_ZONE_MUTE_TOGGLE")
+            and prev.is_volume_muted is not None
+        ):
+            return (
+                lambda: self._device_state.is_volume_muted is not prev.is_volume_muted,
+                False,
+            )
+        aliases = [a for a, c in self._source_map.items() if c == command_name]
+        if aliases:
+            return lambda: self._device_state.source in aliases, True
+        return lambda: True, False
+
+    def snapshot(self):
+        """Save the power, source, volume and mute state for async_restore."""
+        # The state is immutable so there is no need to copy it
+        self._snapshot = self._device_state
+
+    async def async_restore(self, timeout: float):
+        """
+        Restore the state saved by snapshot using the fewest commands.
+
+        Waits up to timeout seconds for the device to turn on if need be.
+        """
+        if self._snapshot is None:
+            raise HomeAssistantError(f"There is no snapshot of {self.entity_id}")
+        await self._cancel_volume_ramp()
+        await self._cancel_volume_steps()
+        commands = plan_restore_commands(
+            self._device_state, self._snapshot, self._source_map
+        )
+        if commands == [RestoreCommand("POWER_ON")]:
+            await self.async_send_command_and_confirm("POWER_ON", timeout)
+            commands = plan_restore_commands(
+                self._device_state, self._snapshot, self._source_map
+            )
+        _LOGGER.debug("Restoring %s with %r", self.entity_id, commands)
+        for command in commands:
+            if command.device_volume is not None:
+                await self._conn.async_send_volume_direct_command(
+                    1, command.device_volume
+                )
+            else:
+                assert command.command_name is not None
+                await self.async_send_command(command.command_name)
+
+    async def async_ramp_volume(self, volume: float, duration: float):
+        """
+        Ramp the volume to a level in the range 0..1 over duration seconds.
+
+        Any ramp already in progress is cancelled.
+        """
+        self._conn.breaker.check()
+        await self._cancel_volume_ramp()
+        await self._cancel_volume_steps()
+        target: int = round(volume * self._conn.meta.max_volume)
+        self._volume_ramp_task = self.hass.async_create_task(
+            self._async_run_volume_ramp(target, duration)
+        )
+
+    async def _cancel_volume_ramp(self):
+        """Cancel the _volume_ramp_task."""
+        if self._volume_ramp_task is not None:
+            if not self._volume_ramp_task.done():
+                self._volume_ramp_task.cancel()
+                try:
+                    await self._volume_ramp_task
+                except asyncio.CancelledError:
+                    pass
+            self._volume_ramp_task = None
+
+    async def _cancel_volume_steps(self):
+        """Cancel the _volume_step_task, dropping any steps not yet sent."""
+        if self._volume_step_task is not None:
+            if not self._volume_step_task.done():
+                self._volume_step_task.cancel()
+                try:
+                    await self._volume_step_task
+                except asyncio.CancelledError:
+                    pass
+            self._volume_step_task = None
+        self._volume_step_target = None
+
+    async def async_profile(self, duration: float):
+        """
+        Profile the handling of messages from the device for duration seconds.
+
+        Only the message handlers are profiled, not the rest of the event
+        loop, so this is cheap enough to run on a live system.   A pstats
+        file and a text summary are written to the config directory.
+        """
+        if self._profiler is not None:
+            raise HomeAssistantError(
+                f"A profile of {self.entity_id} is already in progress"
+            )
+        if is_profiler_active():
+            raise HomeAssistantError(
+                f"Can't profile {self.entity_id} while another profiler is active"
+            )
+        profiler = cProfile.Profile()
+        self._profiler = self._conn.profiler = profiler
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            self._profiler = self._conn.profiler = None
+
+        basename = self.hass.config.path(
+            f"rotel_profile.{self.entity_id}.{int(time.time() * 1000)}"
+        )
+        await self.hass.async_add_executor_job(write_profile, profiler, basename)
+        _LOGGER.warning(
+            "Profile of %s written to %s.prof and %s.txt",
+            self.entity_id,
+            basename,
+            basename,
+        )
+
+    async def _async_run_volume_ramp(self, target: int, duration: float):
+        """Ramp the volume, logging a failure to send as there is no caller."""
+        try:
+            await self._async_ramp_volume_to(target, duration)
+        except HomeAssistantError as err:
+            _LOGGER.warning("Could not ramp volume of %s: %s", self.unique_id, err)
+
+    async def _async_ramp_volume_to(self, target: int, duration: float):
+        """
+        Step the volume towards target, one direct volume command at a time.
+
+        Each step waits for the feedback message that confirms it so the
+        device is never flooded, and the measured feedback latency is used
+        to size the remaining steps so that the ramp finishes on time.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration
+        current = self._device_state.device_volume
+        if current is None:
+            # Don't know where we are starting from so just jump to the target
+            _LOGGER.debug("Volume unknown so setting directly to %r", target)
+            await self._conn.async_send_volume_direct_command(1, target)
+            return
+
+        while current != target:
+            step_interval = max(MIN_RAMP_STEP_INTERVAL, self._feedback_latency)
+            volume = next_ramp_volume(
+                current, target, deadline - loop.time(), step_interval
+            )
+            sent_at = loop.time()
+            waiter = await self._conn.async_send_volume_direct_command_confirmed(
+                1, volume, lambda: self._device_state.device_volume == volume
+            )
+            try:
+                async with asyncio.timeout(
+                    RAMP_FEEDBACK_TIMEOUT_FACTOR * step_interval
+                ):
+                    await waiter
+            except TimeoutError:
+                _LOGGER.warning(
+                    "No volume feedback from %s; abandoning volume ramp",
+                    self.unique_id,
+                )
+                return
+            elapsed = loop.time() - sent_at
+            self._feedback_latency = update_feedback_latency(
+                self._feedback_latency, elapsed
+            )
+            if elapsed < MIN_RAMP_STEP_INTERVAL:
+                await asyncio.sleep(MIN_RAMP_STEP_INTERVAL - elapsed)
+            current = volume
+
+    async def _async_run_volume_steps(self):
+        """
+        Send the volume that the presses add up to once they pause.
+
+        Presses that arrive while a command is waiting for its feedback
+        are sent together once it is confirmed and the window has passed.
+        """
+        sent = self._device_state.device_volume
+        try:
+            while True:
+                await asyncio.sleep(VOLUME_STEP_WINDOW)
+                target = self._volume_step_target
+                if target is None or target == sent:
+                    return
+                _LOGGER.debug("Stepping volume to %r", target)
+                send = self._conn.async_send_volume_direct_command_confirmed
+                try:
+                    waiter = await send(
+                        1, target, lambda: self._device_state.device_volume == target
+                    )
+                except HomeAssistantError as err:
+                    # The presses have already returned so there is no
+                    # caller to report this to
+                    _LOGGER.warning(
+                        "Could not step volume of %s: %s", self.unique_id, err
+                    )
+                    return
+                sent = target
+                try:
+                    async with asyncio.timeout(
+                        RAMP_FEEDBACK_TIMEOUT_FACTOR * self._feedback_latency
+                    ):
+                        await waiter
+                except TimeoutError:
+                    _LOGGER.warning("No volume feedback from %s", self.unique_id)
+                    return
+        finally:
+            self._volume_step_target = None
+            self._volume_step_task = None
+
+
+def write_profile(profiler: cProfile.Profile, basename: str) -> None:
+    """Write a pstats file and a summary.  This blocks so run it in an executor."""
+    profiler.dump_stats(f"{basename}.prof")
+    with open(f"{basename}.txt", "w", encoding="utf-8") as summary:
+        summary.write(format_profile_summary(profiler))
+
+
+@lru_cache
+def get_entity_class(unrecorded: frozenset[str]) -> type[RotelMediaPlayer]:
+    """
+    Return a RotelMediaPlayer class that excludes unrecorded from the recorder.
+
+    HA only supports unrecorded attributes at class level so a subclass
+    is made for each distinct set.
+    """
+    if unrecorded == RotelMediaPlayer._unrecorded_attributes:
+        return RotelMediaPlayer
+    return type(
+        RotelMediaPlayer.__name__,
+        (RotelMediaPlayer,),
+        {"_unrecorded_attributes": unrecorded},
+    )
@@ -0,0 +1,132 @@
+"""Publish the state decoded from a Rotel device to MQTT and accept commands."""
+
+import asyncio
+import json
+import logging
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Collection,
+    Dict,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+from homeassistant.components import mqtt
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+_LOGGER = logging.getLogger(__name__)
+
+COMMAND_TOPIC = "command"
+
+
+class RotelMqttBridge:
+    """
+    Publish device state as retained MQTT messages, one topic per group.
+
+    topics maps each topic, relative to base_topic, to the names of the
+    fields of the device state that are published on it as a compact
+    JSON object.   A topic is only published when one of its fields has
+    changed.   Unchanged values are usually shared between device states
+    so they are compared by identity before equality.
+
+    A command name published to <base_topic>/command is passed to
+    send_command if it is one of command_names.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        base_topic: str,
+        topics: Mapping[str, Tuple[str, ...]],
+        command_names: Collection[str],
+        send_command: Callable[[str], Awaitable[None]],
+    ):
+        self._hass = hass
+        self._base_topic = base_topic
+        self._topics = topics
+        self._command_names = command_names
+        self._send_command = send_command
+        self._device_state: Any = None
+        # The field values last published on each topic
+        self._published: Dict[str, Tuple[Any, ...]] = {}
+        self._start_task: Optional[asyncio.Task] = None
+        self._unsubscribe: Optional[CALLBACK_TYPE] = None
+
+    @property
+    def is_started(self) -> bool:
+        return self._unsubscribe is not None
+
+    def start(self):
+        """Start the bridge once MQTT is available, without waiting for it."""
+        self._start_task = self._hass.async_create_background_task(
+            self._async_start(), f"rotel mqtt bridge {self._base_topic}"
+        )
+
+    def stop(self):
+        """Stop publishing and accepting commands."""
+        if self._start_task is not None:
+            self._start_task.cancel()
+            self._start_task = None
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+    async def _async_start(self):
+        if not await mqtt.async_wait_for_mqtt_client(self._hass):
+            _LOGGER.error("MQTT is not available to publish to %s", self._base_topic)
+            return
+        self._unsubscribe = await mqtt.async_subscribe(
+            self._hass, f"{self._base_topic}/{COMMAND_TOPIC}", self._handle_command
+        )
+        self._start_task = None
+        _LOGGER.info("Bridging to MQTT topic %s", self._base_topic)
+        if self._device_state is not None:
+            self._publish_changes(self._device_state)
+
+    def publish(self, device_state: Any):
+        """Publish the topics that device_state has changed."""
+        if device_state is self._device_state:
+            return
+        self._device_state = device_state
+        if self.is_started:
+            self._publish_changes(device_state)
+
+    def _publish_changes(self, device_state: Any):
+        for topic, names in self._topics.items():
+            values = tuple(getattr(device_state, name) for name in names)
+            prev_values = self._published.get(topic)
+            if prev_values is not None and all(
+                p is v or p == v for p, v in zip(prev_values, values)
+            ):
+                continue
+            self._published[topic] = values
+            payload = json.dumps(dict(zip(names, values)), separators=(",", ":"))
+            self._hass.async_create_task(
+                mqtt.async_publish(
+                    self._hass, f"{self._base_topic}/{topic}", payload, retain=True
+                )
+            )
+
+    @callback
+    def _handle_command(self, msg: mqtt.ReceiveMessage):
+        command_name = str(msg.payload).strip()
+        if command_name not in self._command_names:
+            _LOGGER.warning(
+                "Ignoring unknown command %r on %s", command_name, msg.topic
+            )
+            return
+        _LOGGER.debug("Sending command %s from %s", command_name, msg.topic)
+        self._hass.async_create_task(self._async_send_command(command_name, msg.topic))
+
+    async def _async_send_command(self, command_name: str, topic: str):
+        # There is no caller to report a failure to, so log it
+        try:
+            await self._send_command(command_name)
+        except HomeAssistantError as err:
+            _LOGGER.error(
+                "Could not send command %s from %s: %s", command_name, topic, err
+            )
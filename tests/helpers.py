@@ -0,0 +1,94 @@
+"""A fake connection and a player built on it for the tests to share."""
+
+import asyncio
+from typing import Dict, List, Optional
+from unittest.mock import MagicMock
+
+from rsp1570serial.messages import FeedbackMessage
+from rsp1570serial.rotel_model_meta import RSP1570_META, RotelModelMeta
+
+from custom_components.rotel.media_player import (
+    ATTRIBUTE_GROUPS,
+    RotelConnectionWrapper,
+    RotelConnectionWrapperFactory,
+    RotelMediaPlayer,
+    make_alias_source_map,
+)
+
+SOURCE_ALIASES = {"VIDEO 3": "APPLE TV"}
+
+
+def feedback(source: str, volume: int = 45) -> FeedbackMessage:
+    return FeedbackMessage(
+        "{:8.8s}      VOL  {:02d}".format(source, volume), 21 * " ", bytes(5)
+    )
+
+
+class FakeAmpConn:
+    """Responds to commands with canned feedback messages."""
+
+    def __init__(self, responses, meta=RSP1570_META):
+        self.meta = meta
+        self.responses = responses
+        self.sent = []
+        self.queue = asyncio.Queue()
+
+    async def send_command(self, command_name):
+        self.sent.append(command_name)
+        for message in self.responses.get(command_name, []):
+            self.queue.put_nowait(message)
+
+    async def send_volume_direct_command(self, zone, volume):
+        self.sent.append(("VOLUME_DIRECT", zone, volume))
+        self.queue.put_nowait(feedback("VIDEO 1", volume))
+
+    async def read_messages(self):
+        while True:
+            yield await self.queue.get()
+
+
+def make_player(
+    responses: Optional[Dict[str, List[FeedbackMessage]]] = None,
+    *,
+    unique_id: str = "rotel_test",
+    meta: RotelModelMeta = RSP1570_META,
+    source_aliases: Optional[Dict[str, str]] = SOURCE_ALIASES,
+    attribute_groups: frozenset[str] = frozenset(ATTRIBUTE_GROUPS),
+    mqtt_topic: Optional[str] = None,
+    run_tasks: bool = False,
+) -> RotelMediaPlayer:
+    """
+    Make a player connected to a FakeAmpConn that sends responses.
+
+    hass is a MagicMock unless run_tasks is True, in which case the tasks
+    that the player creates run on the running event loop.
+    """
+    player = RotelMediaPlayer(
+        unique_id,
+        "Rotel Test",
+        RotelConnectionWrapperFactory("/dev/null", unique_id, meta),
+        make_alias_source_map(meta, source_aliases),
+        attribute_groups,
+        mqtt_topic,
+    )
+    player.hass = MagicMock()
+    if run_tasks:
+        player.hass.async_create_task = asyncio.create_task
+        player.hass.async_create_background_task = lambda coro, name: (
+            asyncio.create_task(coro)
+        )
+    player.entity_id = f"media_player.{unique_id}"
+    player.async_schedule_update_ha_state = lambda: None
+    player._conn = RotelConnectionWrapper(FakeAmpConn(responses or {}, meta), unique_id)
+    return player
+
+
+async def run_with_reader(player, coro):
+    reader = asyncio.create_task(
+        player._conn.async_read_messages(player.handle_message)
+    )
+    try:
+        return await coro
+    finally:
+        reader.cancel()
+        await reader
@@ -0,0 +1,82 @@
+from rsp1570serial.messages import FeedbackMessage, SmartDisplayMessage, TriggerMessage
+from rsp1570serial.rotel_model_meta import RSP1572_META
+
+from custom_components.rotel.media_player import (
+    RotelDeviceState,
+    RotelMediaPlayer,
+    is_published_change,
+)
+
+from .helpers import make_player
+
+LINE1 = "VIDEO 1      VOL  45"
+FLAGS = bytes(5)
+DOLBY_FLAGS = bytes([0x00, 0x00, 0x00, 0x01, 0x00])
+
+
+def make_counting_player(
+    attribute_groups=frozenset({"icons"}),
+) -> RotelMediaPlayer:
+    """Make a player that counts its state writes."""
+    player = make_player(
+        meta=RSP1572_META, source_aliases=None, attribute_groups=attribute_groups
+    )
+    player.writes = 0
+
+    def count_write():
+        player.writes += 1
+
+    player.async_schedule_update_ha_state = count_write
+    return player
+
+
+def test_is_published_change():
+    prev = RotelDeviceState(is_on=True, info="DOLBY")
+    assert not is_published_change(prev, prev, ())
+    assert is_published_change(prev, RotelDeviceState(is_on=True, info="DTS"), ())
+    flags_only = RotelDeviceState(is_on=True, info="DOLBY", icon_flags=DOLBY_FLAGS)
+    assert not is_published_change(prev, flags_only, ())
+    icons = RotelDeviceState(is_on=True, info="DOLBY", icons=["Dolby"])
+    assert not is_published_change(prev, icons, ())
+    assert is_published_change(prev, icons, ("icons",))
+
+
+def test_identical_feedback_not_written():
+    player = make_counting_player()
+    player.handle_message(FeedbackMessage(LINE1, "DOLBY", FLAGS))
+    player.handle_message(FeedbackMessage(LINE1, "DOLBY", FLAGS))
+    assert player.writes == 1
+    assert player.skipped_state_writes == 1
+
+
+def test_changed_info_written():
+    player = make_counting_player()
+    player.handle_message(FeedbackMessage(LINE1, "DOLBY", FLAGS))
+    player.handle_message(FeedbackMessage(LINE1, "OLBY D", FLAGS))
+    assert player.writes == 2
+    assert player.skipped_state_writes == 0
+
+
+def test_unpublished_icon_change_not_written():
+    player = make_counting_player(frozenset())
+    player.handle_message(FeedbackMessage(LINE1, "DOLBY", FLAGS))
+    player.handle_message(FeedbackMessage(LINE1, "DOLBY", DOLBY_FLAGS))
+    assert player.writes == 1
+    assert player.skipped_state_writes == 1
+    assert player._device_state.icon_flags == DOLBY_FLAGS
+
+
+def test_published_icon_change_written():
+    player = make_counting_player()
+    player.handle_message(FeedbackMessage(LINE1, "DOLBY", FLAGS))
+    player.handle_message(FeedbackMessage(LINE1, "DOLBY", DOLBY_FLAGS))
+    assert player.writes == 2
+
+
+def test_repeated_trigger_and_smart_display_not_written():
+    player = make_counting_player(frozenset({"triggers", "smart_display"}))
+    for _ in range(2):
+        player.handle_message(TriggerMessage(bytes([1, 0, 0, 0, 0])))
+        player.handle_message(SmartDisplayMessage(["LINE 1"], 1))
+    assert player.writes == 2
+    assert player.skipped_state_writes == 2
@@ -0,0 +1,141 @@
+import asyncio
+from unittest.mock import patch
+
+from pytest import raises
+
+from custom_components.rotel.media_player import (
+    BREAKER_CLOSED,
+    BREAKER_HALF_OPEN,
+    BREAKER_OPEN,
+    CircuitBreaker,
+    RotelConnectionWrapper,
+)
+from homeassistant.exceptions import HomeAssistantError
+
+from .helpers import FakeAmpConn, feedback, make_player
+
+
+class BrokenAmpConn(FakeAmpConn):
+    """Fails every write after it has been unplugged."""
+
+    def __init__(self, responses):
+        super().__init__(responses)
+        self.unplugged = False
+        self.attempts = 0
+
+    async def send_command(self, command_name):
+        self.attempts += 1
+        if self.unplugged:
+            raise OSError("device unplugged")
+        await super().send_command(command_name)
+
+
+class HungAmpConn(FakeAmpConn):
+    async def send_command(self, command_name):
+        await asyncio.sleep(10)
+
+
+def test_breaker_opens_after_consecutive_failures():
+    changes = []
+    breaker = CircuitBreaker("rotel_test", failure_threshold=3)
+    breaker.listener = changes.append
+    breaker.record_failure("one")
+    breaker.record_success()
+    breaker.record_failure("two")
+    breaker.record_failure("three")
+    assert breaker.state == BREAKER_CLOSED
+    breaker.check()
+    breaker.record_failure("four")
+    assert breaker.state == BREAKER_OPEN
+    with raises(HomeAssistantError, match="four"):
+        breaker.check()
+    assert changes == [BREAKER_OPEN]
+
+
+def test_breaker_half_open_after_reset():
+    breaker = CircuitBreaker("rotel_test")
+    breaker.reset()
+    assert breaker.state == BREAKER_CLOSED
+    breaker.trip("connection closed")
+    breaker.reset()
+    assert breaker.state == BREAKER_HALF_OPEN
+    breaker.check()
+    # A single failure is enough to open it again
+    breaker.record_failure("still broken")
+    assert breaker.state == BREAKER_OPEN
+    breaker.reset()
+    breaker.record_success()
+    assert breaker.state == BREAKER_CLOSED
+
+
+def test_commands_fail_fast_after_write_failures():
+    amp_conn = BrokenAmpConn({})
+    conn = RotelConnectionWrapper(amp_conn, "rotel_test")
+    amp_conn.unplugged = True
+
+    async def run():
+        for _ in range(3):
+            with raises(HomeAssistantError, match="unplugged"):
+                await conn.async_send_command("VOLUME_UP")
+        with raises(HomeAssistantError, match="rotel_reconnect"):
+            await conn.async_send_command("VOLUME_UP")
+
+    asyncio.run(run())
+    assert conn.breaker.state == BREAKER_OPEN
+    assert amp_conn.attempts == 3
+
+
+def test_hung_write_times_out():
+    conn = RotelConnectionWrapper(HungAmpConn({}), "rotel_test")
+
+    async def run():
+        with patch("custom_components.rotel.media_player.WRITE_TIMEOUT", 0.01):
+            with raises(HomeAssistantError, match="TimeoutError"):
+                await conn.async_send_command("VOLUME_UP")
+
+    asyncio.run(run())
+    assert conn.breaker.failures == 1
+
+
+def test_reader_end_opens_breaker_and_reconnect_half_opens():
+    amp_conn = FakeAmpConn({})
+    conn = RotelConnectionWrapper(amp_conn, "rotel_test")
+
+    async def read_nothing():
+        return
+        yield  # pylint: disable=unreachable
+
+    amp_conn.read_messages = read_nothing
+
+    async def run():
+        await conn.async_read_messages(lambda message: None)
+        assert conn.breaker.state == BREAKER_OPEN
+        with raises(HomeAssistantError):
+            await conn.async_send_command("VOLUME_UP")
+
+        # As RotelMediaPlayer.async_reconnect does
+        new_amp_conn = FakeAmpConn({})
+        new_conn = RotelConnectionWrapper(new_amp_conn, "rotel_test", conn.breaker)
+        new_conn.breaker.reset()
+        assert new_conn.breaker.state == BREAKER_HALF_OPEN
+        reader = asyncio.create_task(new_conn.async_read_messages(lambda message: None))
+        await asyncio.sleep(0)
+        new_amp_conn.queue.put_nowait(feedback("VIDEO 1"))
+        await asyncio.sleep(0.01)
+        reader.cancel()
+        await reader
+        return new_conn
+
+    new_conn = asyncio.run(run())
+    assert new_conn.breaker.state == BREAKER_CLOSED
+
+
+def test_breaker_state_attribute():
+    player = make_player({})
+    writes = []
+    player.async_schedule_update_ha_state = lambda: writes.append(1)
+    player._conn.breaker.listener = player._handle_breaker_change
+    assert player.extra_state_attributes["circuit_breaker"] == "closed"
+    player._conn.breaker.trip("connection closed")
+    assert player.extra_state_attributes["circuit_breaker"] == "open"
+    assert writes == [1]
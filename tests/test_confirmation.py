@@ -0,0 +1,107 @@
+import asyncio
+
+from pytest import raises
+
+from homeassistant.exceptions import HomeAssistantError
+
+from .helpers import feedback, make_player, run_with_reader
+
+
+def test_select_source_confirmed():
+    responses = {
+        # Some unrelated feedback arrives first
+        "SOURCE_VIDEO_3": [feedback("VIDEO 1", 46), feedback("APPLE TV")],
+    }
+    player = make_player(responses)
+
+    async def run():
+        await run_with_reader(
+            player, player.async_send_command_and_confirm("SOURCE_VIDEO_3", 1.0)
+        )
+
+    asyncio.run(run())
+    assert player.source == "APPLE TV"
+    assert player._conn._feedback_waiters == {}
+
+
+def test_power_on_confirmed():
+    player = make_player({"POWER_ON": [feedback("VIDEO 1")]})
+
+    async def run():
+        await run_with_reader(
+            player, player.async_send_command_and_confirm("POWER_ON", 1.0)
+        )
+
+    asyncio.run(run())
+    assert player._device_state.is_on
+
+
+def test_power_on_when_already_on_confirmed_at_once():
+    # The device sends no feedback because nothing changes
+    player = make_player({})
+    player.handle_message(feedback("VIDEO 1"))
+
+    # No reader is needed because no feedback is awaited
+    asyncio.run(player.async_send_command_and_confirm("POWER_ON", 0.5))
+    assert player._conn._conn.sent[-1] == "POWER_ON"
+    assert player._conn._feedback_waiters == {}
+
+
+def test_source_already_selected_confirmed_at_once():
+    player = make_player({})
+    player.handle_message(feedback("APPLE TV"))
+
+    # No reader is needed because no feedback is awaited
+    asyncio.run(player.async_send_command_and_confirm("SOURCE_VIDEO_3", 0.5))
+
+
+def test_toggle_waits_for_feedback():
+    player = make_player({})
+    player.handle_message(feedback("VIDEO 1"))
+
+    async def run():
+        await run_with_reader(
+            player, player.async_send_command_and_confirm("POWER_TOGGLE", 0.1)
+        )
+
+    with raises(HomeAssistantError):
+        asyncio.run(run())
+
+
+def test_confirmation_timeout():
+    player = make_player({"SOURCE_VIDEO_3": [feedback("VIDEO 1")]})
+
+    async def run():
+        await run_with_reader(
+            player, player.async_send_command_and_confirm("SOURCE_VIDEO_3", 0.1)
+        )
+
+    with raises(HomeAssistantError):
+        asyncio.run(run())
+    assert player._conn._feedback_waiters == {}
+
+
+def test_other_command_confirmed_by_any_feedback():
+    player = make_player({"DSP_1": [feedback("VIDEO 1")]})
+
+    async def run():
+        await run_with_reader(
+            player, player.async_send_command_and_confirm("DSP_1", 1.0)
+        )
+
+    asyncio.run(run())
+    assert "DSP_1" in player._conn._conn.sent
+
+
+def test_volume_ramp():
+    player = make_player({})
+    player.handle_message(feedback("VIDEO 1", 20))
+
+    async def run():
+        await run_with_reader(player, player._async_run_volume_ramp(30, 0.5))
+
+    asyncio.run(run())
+    volumes = [c[2] for c in player._conn._conn.sent if c[0] == "VOLUME_DIRECT"]
+    assert volumes == sorted(volumes)
+    assert volumes[-1] == 30
+    assert player._device_state.device_volume == 30
@@ -0,0 +1,119 @@
+from dataclasses import FrozenInstanceError
+
+from pytest import raises
+from rsp1570serial.messages import FeedbackMessage, SmartDisplayMessage, TriggerMessage
+
+from custom_components.rotel.media_player import (
+    INITIAL_INPUT_ICONS,
+    RotelDeviceState,
+    decode_feedback_message,
+    decode_smart_display_message,
+    decode_trigger_message,
+)
+
+FLAGS_STEREO = bytes([0x01, 0x00, 0x08, 0x00, 0xA4])
+FLAGS_DOLBY = bytes([0x00, 0x84, 0x08, 0x00, 0xA4])
+
+
+def feedback(volume: int, info: str, flags: bytes) -> FeedbackMessage:
+    return FeedbackMessage(
+        "VIDEO 1       VOL  {:02d}".format(volume), info.ljust(21), flags
+    )
+
+
+def test_device_state_is_immutable():
+    device_state = RotelDeviceState()
+    with raises(FrozenInstanceError):
+        device_state.is_on = True
+    assert not hasattr(device_state, "__dict__")
+
+
+def test_decode_feedback_message():
+    device_state = decode_feedback_message(
+        RotelDeviceState(), feedback(45, "STEREO", FLAGS_STEREO)
+    )
+    assert device_state.is_on
+    assert device_state.source == "VIDEO 1"
+    assert device_state.device_volume == 45
+    assert device_state.is_volume_muted is False
+    assert device_state.info == "STEREO"
+    assert device_state.icon_flags == FLAGS_STEREO
+    assert device_state.input_icons["A"]
+    assert device_state.speaker_icons["SW"]
+
+
+def test_decode_feedback_message_shares_unchanged_icons():
+    prev = decode_feedback_message(
+        RotelDeviceState(), feedback(45, "STEREO", FLAGS_STEREO)
+    )
+    device_state = decode_feedback_message(prev, feedback(46, "STEREO", FLAGS_STEREO))
+    assert device_state is not prev
+    assert device_state.device_volume == 46
+    assert device_state.icons is prev.icons
+    assert device_state.speaker_icons is prev.speaker_icons
+    assert device_state.input_icons is prev.input_icons
+
+
+def test_decode_feedback_message_shares_unchanged_icon_groups():
+    prev = decode_feedback_message(
+        RotelDeviceState(), feedback(45, "STEREO", FLAGS_STEREO)
+    )
+    device_state = decode_feedback_message(prev, feedback(45, "DOLBY", FLAGS_DOLBY))
+    assert device_state.sound_mode_icons["Dolby Digital"]
+    assert device_state.sound_mode_icons is not prev.sound_mode_icons
+    assert device_state.input_icons is not prev.input_icons
+    assert device_state.speaker_icons is prev.speaker_icons
+    assert device_state.state_icons is prev.state_icons
+
+
+def test_decode_feedback_message_unchanged():
+    prev = decode_feedback_message(
+        RotelDeviceState(), feedback(45, "STEREO", FLAGS_STEREO)
+    )
+    assert decode_feedback_message(prev, feedback(45, "STEREO", FLAGS_STEREO)) is prev
+
+
+def test_decode_trigger_message():
+    prev = RotelDeviceState()
+    device_state = decode_trigger_message(prev, TriggerMessage(b"\x01\x01\x00\x00\x00"))
+    assert device_state.triggers[0] == [
+        "All",
+        ["on", "off", "off", "off", "off", "off"],
+    ]
+    assert (
+        decode_trigger_message(device_state, TriggerMessage(b"\x01\x01\x00\x00\x00"))
+        is device_state
+    )
+
+
+def test_decode_smart_display_message():
+    prev = RotelDeviceState()
+    device_state = decode_smart_display_message(
+        prev, SmartDisplayMessage(["Line 1"], 1)
+    )
+    assert device_state.smart_display[0] == "Line 1"
+    assert (
+        decode_smart_display_message(device_state, SmartDisplayMessage(["Line 1"], 1))
+        is device_state
+    )
+
+
+def test_decode_feedback_message_minimal_profile():
+    device_state = decode_feedback_message(
+        RotelDeviceState(), feedback(45, "STEREO", FLAGS_STEREO), frozenset()
+    )
+    assert device_state.device_volume == 45
+    assert device_state.icon_flags == FLAGS_STEREO
+    assert device_state.icons is None
+    assert device_state.input_icons is INITIAL_INPUT_ICONS
+
+
+def test_decode_feedback_message_some_groups():
+    device_state = decode_feedback_message(
+        RotelDeviceState(),
+        feedback(45, "DOLBY", FLAGS_DOLBY),
+        frozenset(["sound_mode"]),
+    )
+    assert device_state.sound_mode_icons["Dolby Digital"]
+    assert device_state.icons is None
+    assert device_state.input_icons is INITIAL_INPUT_ICONS
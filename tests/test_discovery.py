@@ -0,0 +1,175 @@
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+from pytest import raises
+from rsp1570serial.emulator import RotelRSP1570Emulator
+from rsp1570serial.messages import MessageCodec
+from rsp1570serial.rotel_model_meta import RSP1570_META, RSP1572_META
+
+from custom_components.rotel.config_flow import RotelConfigFlow
+from custom_components.rotel.discovery import (
+    DiscoveredDevice,
+    async_discover,
+    async_probe,
+    detect_model,
+    make_socket_urls,
+)
+
+
+def test_detect_model():
+    codec = MessageCodec(RSP1572_META)
+    assert detect_model(codec.encode_command("POWER_ON")[2:]) == "rsp1572"
+    assert detect_model(bytes([RSP1570_META.device_id, 0x20])) == "rsp1570"
+    assert detect_model(bytes([0x01, 0x20])) is None
+    assert detect_model(b"") is None
+
+
+def test_make_socket_urls():
+    assert make_socket_urls("rotel.local", 4000, 4002) == [
+        "socket://rotel.local:4000",
+        "socket://rotel.local:4001",
+        "socket://rotel.local:4002",
+    ]
+
+
+async def start_server(handler):
+    server = await asyncio.start_server(handler, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"socket://127.0.0.1:{port}"
+
+
+def test_probe_finds_emulated_device():
+    emulator = RotelRSP1570Emulator(RSP1572_META, is_on=True)
+
+    async def handle(reader, writer):
+        await reader.read(1)
+        writer.write(emulator.encode_feedback_message())
+        await writer.drain()
+        await reader.read()
+        writer.close()
+
+    async def run():
+        server, url = await start_server(handle)
+        async with server:
+            return url, await async_probe(url, 1.0)
+
+    url, found = asyncio.run(run())
+    assert found == DiscoveredDevice(url, "rsp1572")
+
+
+def test_probe_times_out_on_silent_device():
+    async def handle(reader, writer):
+        await reader.read()
+        writer.close()
+
+    async def run():
+        server, url = await start_server(handle)
+        async with server:
+            return await async_probe(url, 0.2)
+
+    assert asyncio.run(run()) is None
+
+
+def test_discover_is_concurrent():
+    async def silent(reader, writer):
+        await reader.read()
+        writer.close()
+
+    async def run():
+        servers = [await start_server(silent) for _ in range(8)]
+        # One port with nothing listening
+        closed, _ = servers[-1]
+        closed.close()
+        await closed.wait_closed()
+        start = time.perf_counter()
+        found = await async_discover(
+            [url for _, url in servers], timeout=0.2, max_concurrent_probes=4
+        )
+        elapsed = time.perf_counter() - start
+        for server, _ in servers[:-1]:
+            server.close()
+        return found, elapsed
+
+    found, elapsed = asyncio.run(run())
+    assert found == []
+    # 7 silent probes, 4 at a time, need two rounds of the timeout
+    assert elapsed < 1.0
+
+
+class SlowOpenAmpConn:
+    """Opens after a delay, like an open that runs in an executor."""
+
+    opened = []
+
+    def __init__(self, serial_port, meta):
+        self.serial_port = serial_port
+        self.writer = None
+        self.reader = None
+
+    async def open(self):
+        await asyncio.sleep(0.1)
+        self.reader = asyncio.StreamReader()
+        self.writer = MagicMock()
+        SlowOpenAmpConn.opened.append(self)
+
+
+def test_cancelled_serial_open_is_closed():
+    async def run():
+        with patch("custom_components.rotel.discovery.RotelAmpConn", SlowOpenAmpConn):
+            probe = asyncio.create_task(async_probe("/dev/ttyUSB0", 1.0))
+            await asyncio.sleep(0.01)
+            probe.cancel()
+            with raises(asyncio.CancelledError):
+                await probe
+            await asyncio.sleep(0.2)
+
+    asyncio.run(run())
+    (conn,) = SlowOpenAmpConn.opened
+    conn.writer.close.assert_called_once()
+
+
+def test_config_flow_only_probes_chosen_ports_not_in_use():
+    flow = RotelConfigFlow()
+    flow.hass = MagicMock()
+
+    async def add_executor_job(target, *args):
+        return target(*args)
+
+    flow.hass.async_add_executor_job = add_executor_job
+    flow._async_current_ids = lambda: {"/dev/ttyUSB1"}
+    probed = []
+
+    async def discover(devices):
+        probed.extend(devices)
+        return []
+
+    async def run():
+        with patch(
+            "custom_components.rotel.config_flow.list_serial_ports",
+            lambda: ["/dev/ttyUSB0", "/dev/ttyUSB1", "/dev/ttyUSB2", "/dev/ttyACM0"],
+        ), patch(
+            "custom_components.rotel.config_flow.devices_in_use",
+            lambda hass: {"/dev/ttyUSB2", "socket://rotel.local:4001"},
+        ), patch(
+            "custom_components.rotel.config_flow.async_discover", discover
+        ):
+            form = await flow.async_step_user()
+            ports = form["data_schema"].schema["serial_ports"].options
+            assert list(ports) == ["/dev/ttyUSB0", "/dev/ttyACM0"]
+            result = await flow.async_step_user(
+                {
+                    "serial_ports": ["/dev/ttyUSB0"],
+                    "host": "rotel.local",
+                    "port_start": 4000,
+                    "port_end": 4001,
+                }
+            )
+            assert result["errors"] == {"base": "no_devices_found"}
+            result = await flow.async_step_user(
+                {"serial_ports": [], "port_start": 4000, "port_end": 4001}
+            )
+            assert result["errors"] == {"base": "nothing_to_search"}
+
+    asyncio.run(run())
+    assert probed == ["/dev/ttyUSB0", "socket://rotel.local:4000"]
@@ -0,0 +1,121 @@
+from unittest.mock import call
+
+from rsp1570serial.messages import FeedbackMessage, TriggerMessage
+
+from custom_components.rotel.media_player import (
+    EVENT_ICON_CHANGED,
+    EVENT_TRIGGER_CHANGED,
+    changed_icons,
+    changed_triggers,
+)
+
+from .helpers import make_player
+
+LINE1 = "VIDEO 1      VOL  45"
+LINE2 = 21 * " "
+
+
+def test_changed_icons_none():
+    flags = bytes([0x01, 0x80, 0x08, 0x00, 0xF0])
+    assert changed_icons(flags, flags) == []
+
+
+def test_changed_icons_dolby_digital_on():
+    prev_flags = bytes([0x00, 0x00, 0x08, 0x00, 0x00])
+    flags = bytes([0x00, 0x80, 0x08, 0x00, 0x00])
+    assert changed_icons(prev_flags, flags) == [("Dolby Digital", True)]
+
+
+def test_changed_icons_on_and_off():
+    prev_flags = bytes([0x01, 0x00, 0x00, 0x00, 0x00])
+    flags = bytes([0x00, 0x00, 0x00, 0x00, 0x04])
+    assert sorted(changed_icons(prev_flags, flags)) == [("A", False), ("SW", True)]
+
+
+def test_changed_triggers_none():
+    flags = bytes([0x01, 0x01, 0x00, 0x00, 0x00])
+    assert changed_triggers(flags, flags) == []
+
+
+def test_changed_triggers():
+    prev_flags = bytes([0x00, 0x00, 0x00, 0x00, 0x00])
+    flags = bytes([0x01, 0x01, 0x00, 0x00, 0x20])
+    assert changed_triggers(prev_flags, flags) == [
+        ("All", 1, True),
+        ("Main", 1, True),
+        ("Zone 4", 6, True),
+    ]
+
+
+def test_changed_triggers_off():
+    prev_flags = bytes([0x03, 0x00, 0x00, 0x00, 0x00])
+    flags = bytes([0x01, 0x00, 0x00, 0x00, 0x00])
+    assert changed_triggers(prev_flags, flags) == [("All", 2, False)]
+
+
+def test_icon_events_fired_by_feedback():
+    player = make_player()
+    fire = player.hass.bus.async_fire
+    player.handle_message(FeedbackMessage(LINE1, LINE2, bytes([0, 0, 0x08, 0, 0])))
+    # Nothing to compare the first message with
+    fire.assert_not_called()
+    player.handle_message(FeedbackMessage(LINE1, LINE2, bytes([0, 0x80, 0x08, 0, 0])))
+    fire.assert_called_once_with(
+        EVENT_ICON_CHANGED,
+        {
+            "entity_id": "media_player.rotel_test",
+            "icon": "Dolby Digital",
+            "state": "on",
+        },
+    )
+    fire.reset_mock()
+    player.handle_message(FeedbackMessage(LINE1, LINE2, bytes([0, 0, 0x08, 0, 0])))
+    fire.assert_called_once_with(
+        EVENT_ICON_CHANGED,
+        {
+            "entity_id": "media_player.rotel_test",
+            "icon": "Dolby Digital",
+            "state": "off",
+        },
+    )
+
+
+def test_trigger_events_fired_by_trigger_message():
+    player = make_player()
+    fire = player.hass.bus.async_fire
+    player.handle_message(TriggerMessage(bytes([0x01, 0, 0, 0, 0])))
+    fire.assert_not_called()
+    player.handle_message(TriggerMessage(bytes([0x03, 0x01, 0, 0, 0])))
+    assert fire.call_args_list == [
+        call(
+            EVENT_TRIGGER_CHANGED,
+            {
+                "entity_id": "media_player.rotel_test",
+                "zone": "All",
+                "trigger": 2,
+                "state": "on",
+            },
+        ),
+        call(
+            EVENT_TRIGGER_CHANGED,
+            {
+                "entity_id": "media_player.rotel_test",
+                "zone": "Main",
+                "trigger": 1,
+                "state": "on",
+            },
+        ),
+    ]
+    fire.reset_mock()
+    # Nothing changed
+    player.handle_message(TriggerMessage(bytes([0x03, 0x01, 0, 0, 0])))
+    fire.assert_not_called()
+
+
+def test_no_events_for_disabled_groups():
+    player = make_player(attribute_groups=frozenset())
+    player.handle_message(FeedbackMessage(LINE1, LINE2, bytes([0, 0, 0x08, 0, 0])))
+    player.handle_message(TriggerMessage(bytes([0x01, 0, 0, 0, 0])))
+    player.handle_message(FeedbackMessage(LINE1, LINE2, bytes([0, 0x80, 0x08, 0, 0])))
+    player.handle_message(TriggerMessage(bytes([0x03, 0, 0, 0, 0])))
+    player.hass.bus.async_fire.assert_not_called()
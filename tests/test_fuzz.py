@@ -0,0 +1,259 @@
+"""
+Generative tests that throw random and adversarial messages at the entity.
+
+Each test is driven by a seeded random.Random so that any failure can be
+reproduced from the seed in the test id.
+"""
+
+import gc
+import random
+import string
+import time
+from typing import List
+
+from pytest import fixture, mark
+from rsp1570serial.message_types import (
+    MSGTYPE_FEEDBACK_STRING,
+    MSGTYPE_TRIGGER_SMART_DISPLAY_STRING_1,
+    MSGTYPE_TRIGGER_SMART_DISPLAY_STRING_2,
+    MSGTYPE_TRIGGER_STATUS_STRING,
+)
+from rsp1570serial.messages import (
+    AnyMessage,
+    FeedbackMessage,
+    MessageCodec,
+    SmartDisplayMessage,
+    TriggerMessage,
+)
+from rsp1570serial.rotel_model_meta import RSP1572_META
+
+from custom_components.rotel.media_player import (
+    INPUT_ICON_NAMES,
+    MISC_ICON_NAMES,
+    SOUND_MODE_ICON_NAMES,
+    SPEAKER_ICON_NAMES,
+    STATE_ICON_NAMES,
+    RotelMediaPlayer,
+    make_smart_display_lines,
+)
+from homeassistant.components.media_player.const import MediaPlayerState
+
+from .helpers import make_player
+
+SEEDS = range(25)
+MESSAGES_PER_SEED = 400
+# Half of asyncio's slow callback threshold; typical messages take microseconds
+MAX_MESSAGE_TIME = 0.05
+
+OFF_LINE = 21 * "\x00"
+SOURCES = ["VIDEO 1", "CATV", " CD", "TUNER", "iPod/USB", "", "LONGSOURCENAME"]
+VOLUME_STRINGS = ["VOL  00", "VOL  45", "VOL  96", "MUTE ON", 7 * " "]
+INFO_LINES = [
+    "DOLBY PL\x19 C     48K  ",
+    "  REC    VIDEO 1     ",
+    "  ZONE2  TUNER       ",
+    "  ZONE2 VOL   45     ",
+    "  ZONE3 VOL   xx     ",
+    "  ZONE4  CD          ",
+    21 * " ",
+]
+
+
+def random_text(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(string.printable) for _ in range(length))
+
+
+def random_line1(rng: random.Random) -> str:
+    choice = rng.randrange(5)
+    if choice == 0:
+        return OFF_LINE
+    if choice == 1:
+        return random_text(rng, 21)
+    if choice == 2:
+        # Adversarial volume string, e.g. VOL followed by garbage
+        return "{:8.8s}  pty VOL{:4.4s}".format(
+            rng.choice(SOURCES), random_text(rng, 4)
+        )
+    if choice == 3:
+        return random_text(rng, rng.randrange(30))
+    return "{:8.8s}  {:3.3s} {:7.7s}".format(
+        rng.choice(SOURCES),
+        rng.choice(["pty", ""]),
+        rng.choice(VOLUME_STRINGS),
+    )
+
+
+def random_line2(rng: random.Random) -> str:
+    choice = rng.randrange(3)
+    if choice == 0:
+        return OFF_LINE
+    if choice == 1:
+        return random_text(rng, rng.randrange(30))
+    return rng.choice(INFO_LINES)
+
+
+def random_flags(rng: random.Random) -> bytes:
+    return bytes(rng.randrange(256) for _ in range(5))
+
+
+def random_feedback_message(rng: random.Random) -> FeedbackMessage:
+    message = FeedbackMessage(random_line1(rng), random_line2(rng), random_flags(rng))
+    choice = rng.randrange(4)
+    if choice == 0:
+        # Truncated icon map
+        keep = rng.sample(sorted(message.icons), rng.randrange(len(message.icons)))
+        message.icons = {k: message.icons[k] for k in keep}
+    elif choice == 1:
+        # None icon flags
+        message.icons = {
+            k: None if rng.random() < 0.5 else v for k, v in message.icons.items()
+        }
+    return message
+
+
+def random_smart_display_message(rng: random.Random) -> SmartDisplayMessage:
+    lines = [random_text(rng, 26) for _ in range(rng.randrange(13))]
+    return SmartDisplayMessage(lines, rng.randrange(-3, 14))
+
+
+def random_message(rng: random.Random) -> AnyMessage:
+    choice = rng.randrange(3)
+    if choice == 0:
+        return random_feedback_message(rng)
+    if choice == 1:
+        return TriggerMessage(random_flags(rng))
+    return random_smart_display_message(rng)
+
+
+def random_payload(rng: random.Random) -> bytes:
+    """Return a random but well formed payload for the codec to decode."""
+    choice = rng.randrange(4)
+    if choice == 0:
+        message_type = MSGTYPE_FEEDBACK_STRING
+        data = (
+            random_line1(rng).ljust(21, " ")[:21].encode("ascii")
+            + random_line2(rng).ljust(21, " ")[:21].encode("ascii")
+            + random_flags(rng)
+        )
+    elif choice == 1:
+        message_type = MSGTYPE_TRIGGER_STATUS_STRING
+        data = random_flags(rng)
+    elif choice == 2:
+        message_type = MSGTYPE_TRIGGER_SMART_DISPLAY_STRING_1
+        data = b"\x00\x00" + bytes(rng.randrange(256) for _ in range(26))
+    else:
+        message_type = MSGTYPE_TRIGGER_SMART_DISPLAY_STRING_2
+        data = bytes(rng.randrange(256) for _ in range(234))
+    return bytes([RSP1572_META.device_id, message_type]) + data
+
+
+def check_icon_state_dict(icon_dict, icon_names):
+    assert tuple(icon_dict.keys()) == icon_names
+    assert all(isinstance(v, bool) for v in icon_dict.values())
+
+
+def check_invariants(player: RotelMediaPlayer):
+    assert player.state in (MediaPlayerState.ON, MediaPlayerState.OFF)
+    if player.volume_level is not None:
+        assert isinstance(player.volume_level, float)
+    attributes = player.extra_state_attributes
+    check_icon_state_dict(attributes["speaker_icons"], SPEAKER_ICON_NAMES)
+    check_icon_state_dict(attributes["state_icons"], STATE_ICON_NAMES)
+    check_icon_state_dict(attributes["sound_mode_icons"], SOUND_MODE_ICON_NAMES)
+    check_icon_state_dict(attributes["input_icons"], INPUT_ICON_NAMES)
+    check_icon_state_dict(attributes["misc_icons"], MISC_ICON_NAMES)
+    smart_display = attributes["smart_display"]
+    if smart_display is not None:
+        assert len(smart_display) == 10
+        assert all(isinstance(line, str) for line in smart_display)
+
+
+def process_messages(player: RotelMediaPlayer, messages: List[AnyMessage]) -> float:
+    """Feed messages to the player, checking invariants, and return the worst time."""
+    worst = 0.0
+    for message in messages:
+        # Keep garbage collection pauses out of the timings
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            player.handle_message(message)
+            worst = max(worst, time.perf_counter() - start)
+        finally:
+            gc.enable()
+        check_invariants(player)
+    return worst
+
+
+def make_fuzz_player(**kwargs) -> RotelMediaPlayer:
+    return make_player(
+        unique_id="rotel_fuzz", meta=RSP1572_META, source_aliases=None, **kwargs
+    )
+
+
+@fixture
+def player():
+    return make_fuzz_player()
+
+
+@mark.parametrize("seed", SEEDS)
+def test_random_messages(player, record_property, seed):
+    rng = random.Random(seed)
+    messages = [random_message(rng) for _ in range(MESSAGES_PER_SEED)]
+    worst = process_messages(player, messages)
+    record_property("worst_message_time", worst)
+    assert worst < MAX_MESSAGE_TIME
+
+
+@mark.parametrize("seed", SEEDS)
+def test_random_decoded_payloads(player, record_property, seed):
+    rng = random.Random(seed)
+    codec = MessageCodec(RSP1572_META)
+    messages = [
+        codec.decode_message(random_payload(rng)) for _ in range(MESSAGES_PER_SEED)
+    ]
+    worst = process_messages(player, messages)
+    record_property("worst_message_time", worst)
+    assert worst < MAX_MESSAGE_TIME
+
+
+@mark.parametrize("seed", SEEDS)
+def test_random_smart_display_lines(seed):
+    rng = random.Random(seed)
+    prev_lines = None
+    for _ in range(MESSAGES_PER_SEED):
+        message = random_smart_display_message(rng)
+        lines = make_smart_display_lines(prev_lines, message)
+        assert len(lines) == 10
+        updated = {
+            lineno: line
+            for lineno, line in enumerate(message.lines, message.start)
+            if 1 <= lineno <= 10
+        }
+        for lineno in range(1, 11):
+            if lineno in updated:
+                assert lines[lineno - 1] == updated[lineno]
+            elif prev_lines is None:
+                assert lines[lineno - 1] == ""
+            else:
+                assert lines[lineno - 1] == prev_lines[lineno - 1]
+        prev_lines = lines
+
+
+@mark.parametrize("seed", SEEDS)
+def test_random_messages_minimal_profile(record_property, seed):
+    player = make_fuzz_player(attribute_groups=frozenset())
+    rng = random.Random(seed)
+    worst = 0.0
+    for _ in range(MESSAGES_PER_SEED):
+        message = random_message(rng)
+        start = time.perf_counter()
+        player.handle_message(message)
+        worst = max(worst, time.perf_counter() - start)
+        assert set(player.extra_state_attributes) == {
+            "display_volume",
+            "party_mode_on",
+            "info",
+            "circuit_breaker",
+        }
+    record_property("worst_message_time", worst)
+    player.hass.bus.async_fire.assert_not_called()
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+from pytest import raises
+from rsp1570serial.emulator import RotelRSP1570Emulator
+from rsp1570serial.messages import FeedbackMessage, MessageCodec
+from rsp1570serial.rotel_model_meta import RSP1570_META
+
+from custom_components.rotel.io_thread import ThreadedAmpConn
+from custom_components.rotel.media_player import (
+    RotelConnectionWrapperFactory,
+    RotelMediaPlayer,
+    get_entity_class,
+    unrecorded_attributes,
+)
+
+
+def test_queue_coalesces_and_drops():
+    conn = ThreadedAmpConn("/dev/null", RSP1570_META, max_depth=2)
+    conn._wake = lambda: None
+    conn._put(b"a", "A")
+    conn._put(b"a", "A")
+    conn._put(b"b", "B")
+    conn._put(b"c", "C")
+    assert conn.stats.coalesced == 1
+    assert conn.stats.dropped == 1
+    assert conn.stats.max_depth == 2
+    assert [conn._get(), conn._get(), conn._get()] == ["B", "C", None]
+    assert conn.stats.messages == 2
+    assert conn.stats.depth == 0
+
+
+def test_reads_on_io_thread():
+    emulator = RotelRSP1570Emulator(RSP1570_META, is_on=True)
+    feedback = emulator.encode_feedback_message()
+    received = []
+    threads = set()
+
+    async def handle(reader, writer):
+        received.append(await reader.read(1))
+        # The repeated message is coalesced if it is still queued
+        writer.write(feedback + feedback)
+        await writer.drain()
+        await reader.read()
+
+    async def run():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        conn = ThreadedAmpConn(f"socket://127.0.0.1:{port}", RSP1570_META)
+        original_put = conn._put
+
+        def put(payload, message):
+            threads.add(threading.current_thread())
+            original_put(payload, message)
+
+        conn._put = put
+        async with server:
+            await conn.open()
+            messages = conn.read_messages()
+            await conn.send_command("DISPLAY_REFRESH")
+            message = await asyncio.wait_for(messages.__anext__(), 2.0)
+            await messages.aclose()
+            await conn.close()
+        return conn, message
+
+    conn, message = asyncio.run(run())
+    assert isinstance(message, FeedbackMessage)
+    assert received == [
+        MessageCodec(RSP1570_META).encode_command("DISPLAY_REFRESH")[:1]
+    ]
+    assert threading.main_thread() not in threads
+    assert conn.stats.messages + conn.stats.coalesced >= 1
+    assert conn.stats.max_latency >= 0.0
+    assert conn._thread is None
+
+
+def test_factory_makes_threaded_conn():
+    factory = RotelConnectionWrapperFactory(
+        "/dev/null", "rotel_test", RSP1570_META, True
+    )
+    wrapper = factory.make_conn()
+    assert wrapper.io_queue_stats is not None
+    assert (
+        RotelConnectionWrapperFactory("/dev/null", "rotel_test", RSP1570_META)
+        .make_conn()
+        .io_queue_stats
+        is None
+    )
+
+
+def test_send_when_closed_raises():
+    conn = ThreadedAmpConn("/dev/null", RSP1570_META)
+
+    async def run():
+        with raises(ConnectionError):
+            await conn.send_command("VOLUME_UP")
+        with raises(ConnectionError):
+            await conn.send_volume_direct_command(1, 40)
+
+    asyncio.run(run())
+
+
+def test_io_queue_never_recorded():
+    for entity_class in (
+        RotelMediaPlayer,
+        get_entity_class(unrecorded_attributes(["triggers"])),
+    ):
+        assert "io_queue" in entity_class._Entity__combined_unrecorded_attributes
+
+
+def test_io_queue_attribute():
+    player = RotelMediaPlayer(
+        "rotel_test",
+        "Rotel Test",
+        RotelConnectionWrapperFactory("/dev/null", "rotel_test", RSP1570_META, True),
+        {},
+    )
+    assert player.extra_state_attributes["io_queue"]["messages"] == 0
@@ -0,0 +1,182 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from rsp1570serial.messages import TriggerMessage
+
+from custom_components.rotel.media_player import RotelMediaPlayer
+from homeassistant.components.mqtt import ReceiveMessage
+
+from .helpers import feedback, make_player
+
+BASE_TOPIC = "rotel/test"
+
+
+def make_mqtt_player() -> RotelMediaPlayer:
+    return make_player(
+        attribute_groups=frozenset({"icons", "triggers"}),
+        mqtt_topic=BASE_TOPIC,
+        run_tasks=True,
+    )
+
+
+class FakeMqtt:
+    def __init__(self):
+        self.published = []
+        self.subscriptions = {}
+        self.unsubscribe = MagicMock()
+        self.patches = [
+            patch(
+                "custom_components.rotel.mqtt_bridge.mqtt.async_wait_for_mqtt_client",
+                AsyncMock(return_value=True),
+            ),
+            patch(
+                "custom_components.rotel.mqtt_bridge.mqtt.async_subscribe",
+                self.async_subscribe,
+            ),
+            patch(
+                "custom_components.rotel.mqtt_bridge.mqtt.async_publish",
+                self.async_publish,
+            ),
+        ]
+
+    async def async_subscribe(self, hass, topic, msg_callback):
+        self.subscriptions[topic] = msg_callback
+        return self.unsubscribe
+
+    async def async_publish(self, hass, topic, payload, retain=False):
+        assert retain
+        self.published.append((topic, json.loads(payload)))
+
+    def receive(self, topic, payload):
+        self.subscriptions[topic](ReceiveMessage(topic, payload, 0, False, topic, None))
+
+    def topics(self):
+        return [topic for topic, _ in self.published]
+
+    def __enter__(self):
+        for p in self.patches:
+            p.start()
+        return self
+
+    def __exit__(self, *args):
+        for p in self.patches:
+            p.stop()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_publish_on_start_and_on_change():
+    player = make_mqtt_player()
+
+    async def run():
+        with FakeMqtt() as fake:
+            player._start_mqtt_bridge(BASE_TOPIC)
+            await settle()
+            assert sorted(fake.topics()) == [
+                "rotel/test/device",
+                "rotel/test/icons",
+                "rotel/test/triggers",
+            ]
+            fake.published.clear()
+
+            player.handle_message(feedback("VIDEO 1", 45))
+            await settle()
+            assert fake.published == [
+                (
+                    "rotel/test/device",
+                    {
+                        "is_on": True,
+                        "source": "VIDEO 1",
+                        "device_volume": 45,
+                        "is_volume_muted": False,
+                        "party_mode_on": False,
+                        "info": "",
+                    },
+                ),
+                ("rotel/test/icons", {"icons": []}),
+            ]
+            fake.published.clear()
+
+            # Nothing changed
+            player.handle_message(feedback("VIDEO 1", 45))
+            await settle()
+            assert fake.published == []
+
+            player.handle_message(TriggerMessage(bytes([0x01, 0, 0, 0, 0])))
+            await settle()
+            assert fake.topics() == ["rotel/test/triggers"]
+            return fake
+
+    fake = asyncio.run(run())
+    assert "rotel/test/command" in fake.subscriptions
+
+
+def test_publish_before_mqtt_is_ready():
+    player = make_mqtt_player()
+
+    async def run():
+        with FakeMqtt() as fake:
+            player._start_mqtt_bridge(BASE_TOPIC)
+            player.handle_message(feedback("VIDEO 1", 30))
+            await settle()
+            device = [p for t, p in fake.published if t == "rotel/test/device"]
+            # Only the latest state is published once MQTT is ready
+            assert len(device) == 1
+            assert device[0]["device_volume"] == 30
+
+    asyncio.run(run())
+
+
+def test_commands():
+    player = make_mqtt_player()
+
+    async def run():
+        with FakeMqtt() as fake:
+            player._start_mqtt_bridge(BASE_TOPIC)
+            await settle()
+            fake.receive("rotel/test/command", "VOLUME_UP")
+            fake.receive("rotel/test/command", "NOT_A_COMMAND")
+            await settle()
+
+    asyncio.run(run())
+    assert player._conn._conn.sent == ["VOLUME_UP"]
+
+
+def test_command_failure_logged(caplog):
+    player = make_mqtt_player()
+
+    async def run():
+        with FakeMqtt() as fake:
+            player._start_mqtt_bridge(BASE_TOPIC)
+            await settle()
+            player._conn.breaker.trip("device unplugged")
+            fake.receive("rotel/test/command", "VOLUME_UP")
+            await settle()
+
+    asyncio.run(run())
+    assert player._conn._conn.sent == []
+    assert "Could not send command VOLUME_UP from rotel/test/command" in caplog.text
+
+
+def test_stop():
+    player = make_mqtt_player()
+    player._conn._conn.close = AsyncMock()
+
+    async def run():
+        with FakeMqtt() as fake:
+            player._start_mqtt_bridge(BASE_TOPIC)
+            await settle()
+            fake.published.clear()
+            await player.async_will_remove_from_hass()
+            player.handle_message(feedback("VIDEO 1", 30))
+            await settle()
+            return fake
+
+    fake = asyncio.run(run())
+    assert fake.published == []
+    fake.unsubscribe.assert_called_once()
+    assert player._mqtt_bridge is None
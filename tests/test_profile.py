@@ -0,0 +1,126 @@
+import asyncio
+import cProfile
+import os
+
+from pytest import raises
+
+from custom_components.rotel.media_player import (
+    format_profile_summary,
+    is_profiler_active,
+)
+from homeassistant.exceptions import HomeAssistantError
+
+from .helpers import feedback, make_player
+
+
+def setup_hass(player, tmp_path):
+    player.hass.config.path = lambda *args: os.path.join(tmp_path, *args)
+
+    async def async_add_executor_job(target, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, target, *args)
+
+    player.hass.async_add_executor_job = async_add_executor_job
+
+
+def test_reader_not_profiled_by_default():
+    player = make_player({})
+    assert player._conn.profiler is None
+
+
+def test_profile_writes_stats_and_summary(tmp_path):
+    player = make_player({})
+    setup_hass(player, tmp_path)
+
+    async def run():
+        reader = asyncio.create_task(
+            player._conn.async_read_messages(player.handle_message)
+        )
+        profile = asyncio.create_task(player.async_profile(0.2))
+        await asyncio.sleep(0.05)
+        for volume in range(10):
+            player._conn._conn.queue.put_nowait(feedback("VIDEO 1", volume))
+        await profile
+        reader.cancel()
+        await reader
+
+    asyncio.run(run())
+    assert player._conn.profiler is None
+    names = sorted(os.listdir(tmp_path))
+    assert [os.path.splitext(n)[1] for n in names] == [".prof", ".txt"]
+    assert names[0].startswith("rotel_profile.media_player.rotel_test.")
+    summary = (tmp_path / names[1]).read_text()
+    assert "handle_feedback_message" in summary
+
+
+def test_only_one_profile_at_a_time(tmp_path):
+    player = make_player({})
+    setup_hass(player, tmp_path)
+
+    async def run():
+        first = asyncio.create_task(player.async_profile(0.1))
+        await asyncio.sleep(0)
+        with raises(HomeAssistantError):
+            await player.async_profile(0.1)
+        await first
+
+    asyncio.run(run())
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_profile_refused_while_another_profiler_active(tmp_path):
+    player = make_player({})
+    setup_hass(player, tmp_path)
+    other = cProfile.Profile()
+
+    async def run():
+        other.enable()
+        try:
+            with raises(HomeAssistantError, match="another profiler"):
+                await player.async_profile(0.1)
+        finally:
+            other.disable()
+
+    asyncio.run(run())
+    assert player._conn.profiler is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_reader_survives_another_profiler_starting():
+    player = make_player({})
+    player._conn.profiler = cProfile.Profile()
+    other = cProfile.Profile()
+
+    async def run():
+        reader = asyncio.create_task(
+            player._conn.async_read_messages(player.handle_message)
+        )
+        await asyncio.sleep(0)
+        other.enable()
+        try:
+            player._conn._conn.queue.put_nowait(feedback("VIDEO 1", 30))
+            await asyncio.sleep(0.01)
+            # The other profiler was left running
+            assert is_profiler_active()
+        finally:
+            other.disable()
+        player._conn._conn.queue.put_nowait(feedback("VIDEO 1", 40))
+        await asyncio.sleep(0.01)
+        assert not reader.done()
+        reader.cancel()
+        await reader
+
+    asyncio.run(run())
+    assert player._conn.profiler is None
+    assert player._device_state.device_volume == 40
+
+
+def test_format_profile_summary():
+    profiler = cProfile.Profile()
+    profiler.runcall(sorted, range(10))
+    summary = format_profile_summary(profiler, 5)
+    assert "cumulative" in summary
+    assert "sorted" in summary
+
+
+def test_format_empty_profile_summary():
+    assert "No messages" in format_profile_summary(cProfile.Profile())
@@ -0,0 +1,92 @@
+import asyncio
+
+from custom_components.rotel.media_player import ReadinessGate
+
+from .helpers import FakeAmpConn, feedback, make_player, run_with_reader
+
+BOOT_TIME = 0.1
+
+
+class BootingAmpConn(FakeAmpConn):
+    """Reports that it is on BOOT_TIME after POWER_ON."""
+
+    def __init__(self, boot_time=BOOT_TIME):
+        super().__init__({})
+        self.boot_time = boot_time
+
+    async def send_command(self, command_name):
+        await super().send_command(command_name)
+        if command_name == "POWER_ON" and self.boot_time is not None:
+            asyncio.get_running_loop().call_later(
+                self.boot_time, self.queue.put_nowait, feedback("VIDEO 1")
+            )
+
+
+def make_booting_player(boot_time=BOOT_TIME, timeout=1.0):
+    player = make_player({})
+    player._conn.readiness_gate.timeout = timeout
+    player._conn._conn = BootingAmpConn(boot_time)
+    return player
+
+
+async def turn_on_and_select_source(player):
+    await player.async_turn_on()
+    sent_before_ready = list(player._conn._conn.sent)
+    await player.async_select_source("APPLE TV")
+    await player.async_set_volume_level(0.5)
+    return sent_before_ready
+
+
+def test_commands_held_until_ready():
+    player = make_booting_player()
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        sent_before_ready = await run_with_reader(
+            player, turn_on_and_select_source(player)
+        )
+        return sent_before_ready, loop.time() - start
+
+    sent_before_ready, elapsed = asyncio.run(run())
+    assert sent_before_ready[-1] == "POWER_ON"
+    assert player._conn._conn.sent[-2:] == ["SOURCE_VIDEO_3", ("VOLUME_DIRECT", 1, 48)]
+    assert BOOT_TIME <= elapsed < 0.5
+    time_to_ready = player.extra_state_attributes["time_to_ready"]
+    assert BOOT_TIME <= time_to_ready < 0.5
+    assert not player._conn.readiness_gate.is_armed
+
+
+def test_commands_sent_after_timeout():
+    player = make_booting_player(boot_time=None, timeout=0.1)
+
+    async def run():
+        await run_with_reader(player, turn_on_and_select_source(player))
+
+    asyncio.run(run())
+    assert player._conn._conn.sent[-2:] == ["SOURCE_VIDEO_3", ("VOLUME_DIRECT", 1, 48)]
+    assert "time_to_ready" not in player.extra_state_attributes
+    assert not player._conn.readiness_gate.is_armed
+
+
+def test_gate_disabled_by_zero_timeout():
+    gate = ReadinessGate("rotel_test", 0.0)
+
+    async def run():
+        gate.arm()
+        assert not gate.is_armed
+        await gate.async_wait()
+
+    asyncio.run(run())
+
+
+def test_gate_not_armed_when_already_on():
+    player = make_booting_player()
+    player.handle_message(feedback("VIDEO 1"))
+
+    async def run():
+        await asyncio.sleep(0)
+        await player.async_turn_on()
+        assert not player._conn.readiness_gate.is_armed
+
+    asyncio.run(run_with_reader(player, run()))
@@ -0,0 +1,59 @@
+from custom_components.rotel.media_player import (
+    ATTRIBUTE_GROUPS,
+    RotelMediaPlayer,
+    get_entity_class,
+    unrecorded_attributes,
+)
+from homeassistant.components.media_player import MediaPlayerEntity
+
+
+def test_unrecorded_attributes_default():
+    unrecorded = unrecorded_attributes([])
+    assert unrecorded == frozenset(
+        {
+            "icons",
+            "speaker_icons",
+            "sound_mode_icons",
+            "input_icons",
+            "state_icons",
+            "misc_icons",
+            "triggers",
+            "smart_display",
+            "io_queue",
+        }
+    )
+
+
+def test_unrecorded_attributes_opt_in():
+    unrecorded = unrecorded_attributes(["triggers", "sound_mode"])
+    assert "triggers" not in unrecorded
+    assert "sound_mode_icons" not in unrecorded
+    assert "smart_display" in unrecorded
+
+
+def test_unrecorded_attributes_all_recorded():
+    assert unrecorded_attributes(list(ATTRIBUTE_GROUPS)) == frozenset({"io_queue"})
+
+
+def test_get_entity_class_default():
+    assert get_entity_class(unrecorded_attributes([])) is RotelMediaPlayer
+
+
+def test_io_queue_unrecorded_through_unrecorded_attributes():
+    assert (
+        RotelMediaPlayer._entity_component_unrecorded_attributes
+        == MediaPlayerEntity._entity_component_unrecorded_attributes
+    )
+    for entity_class in (
+        RotelMediaPlayer,
+        get_entity_class(unrecorded_attributes(list(ATTRIBUTE_GROUPS))),
+    ):
+        assert "io_queue" in entity_class._unrecorded_attributes
+
+
+def test_get_entity_class_opt_in():
+    unrecorded = unrecorded_attributes(["smart_display"])
+    entity_class = get_entity_class(unrecorded)
+    assert issubclass(entity_class, RotelMediaPlayer)
+    assert entity_class._unrecorded_attributes == unrecorded
+    assert get_entity_class(unrecorded_attributes(["smart_display"])) is entity_class
@@ -0,0 +1,89 @@
+import asyncio
+from unittest.mock import patch
+
+from custom_components.rotel.media_player import (
+    RefreshScheduler,
+    RotelConnectionWrapper,
+)
+
+from .helpers import FakeAmpConn, feedback
+
+
+class HangsAfterFirstCommandAmpConn(FakeAmpConn):
+    async def send_command(self, command_name):
+        if self.sent:
+            await asyncio.sleep(10)
+        await super().send_command(command_name)
+
+
+def test_refresh_backs_off_while_quiet():
+    scheduler = RefreshScheduler(10.0, 40.0)
+    scheduler.commanded(0.0)
+    assert scheduler.due_in(5.0) == 5.0
+    assert scheduler.due_in(10.0) <= 0
+    intervals = []
+    now = 10.0
+    for _ in range(4):
+        scheduler.refreshed(now)
+        intervals.append(scheduler.interval)
+        now += scheduler.interval
+        assert scheduler.due_in(now) <= 0
+    assert intervals == [20.0, 40.0, 40.0, 40.0]
+    assert scheduler.refreshes == 4
+
+
+def test_refresh_deferred_by_messages():
+    scheduler = RefreshScheduler(10.0, 40.0)
+    scheduler.commanded(0.0)
+    scheduler.confirmed(8.0)
+    assert scheduler.due_in(10.0) == 8.0
+
+
+def test_refresh_tightens_after_command():
+    scheduler = RefreshScheduler(10.0, 40.0)
+    scheduler.refreshed(0.0)
+    scheduler.refreshed(20.0)
+    assert scheduler.interval == 40.0
+    scheduler.commanded(30.0)
+    assert scheduler.interval == 10.0
+    assert scheduler.due_in(30.0) == 10.0
+
+
+def test_refresh_sent_when_stale():
+    amp_conn = FakeAmpConn({})
+    conn = RotelConnectionWrapper(amp_conn, "rotel_test")
+    conn.refresh_scheduler = RefreshScheduler(0.05, 0.1)
+
+    async def run():
+        reader = asyncio.create_task(conn.async_read_messages(lambda message: None))
+        # Messages keep the state fresh so no refresh is needed
+        for _ in range(5):
+            await asyncio.sleep(0.02)
+            amp_conn.queue.put_nowait(feedback("VIDEO 1"))
+        assert amp_conn.sent == ["DISPLAY_REFRESH"]
+        # Then the device goes quiet
+        await asyncio.sleep(0.4)
+        reader.cancel()
+        await reader
+
+    asyncio.run(run())
+    refreshes = amp_conn.sent.count("DISPLAY_REFRESH") - 1
+    # At 0.05s, 0.15s, 0.25s and 0.35s into the quiet period
+    assert 2 <= refreshes <= 5
+    assert conn.refresh_scheduler.interval == 0.1
+
+
+def test_hung_refresh_times_out_and_counts_as_failure():
+    conn = RotelConnectionWrapper(HangsAfterFirstCommandAmpConn({}), "rotel_test")
+    conn.refresh_scheduler = RefreshScheduler(0.05, 0.1)
+
+    async def run():
+        reader = asyncio.create_task(conn.async_read_messages(lambda message: None))
+        with patch("custom_components.rotel.media_player.WRITE_TIMEOUT", 0.01):
+            await asyncio.sleep(0.3)
+        assert not reader.done()
+        reader.cancel()
+        await reader
+
+    asyncio.run(run())
+    assert conn.breaker.failures >= 2
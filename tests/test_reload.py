@@ -0,0 +1,203 @@
+import asyncio
+from unittest.mock import MagicMock
+
+from rsp1570serial.rotel_model_meta import RSP1570_META
+
+from custom_components.rotel import media_player
+from custom_components.rotel.media_player import (
+    DATA_PARKED_CONNECTIONS,
+    RotelConnectionWrapper,
+    RotelConnectionWrapperFactory,
+)
+
+from .helpers import FakeAmpConn, feedback, make_player
+
+
+class OpenableFakeAmpConn(FakeAmpConn):
+    def __init__(self, responses):
+        super().__init__(responses)
+        self.opened = 0
+        self.closed = 0
+
+    async def open(self):
+        self.opened += 1
+
+    async def close(self):
+        self.closed += 1
+
+
+def make_hass():
+    loop = asyncio.get_running_loop()
+    hass = MagicMock()
+    hass.data = {}
+    hass.is_stopping = False
+    hass.loop = loop
+    hass.async_create_task = loop.create_task
+    hass.async_run_hass_job = lambda job, *args: loop.create_task(job.target(*args))
+    return hass
+
+
+def make_connected_player(hass):
+    player = make_player({})
+    player.hass = hass
+    player._conn = RotelConnectionWrapper(OpenableFakeAmpConn({}), "rotel_test")
+    return player
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_reload_adopts_connection_and_state():
+    async def run():
+        hass = make_hass()
+        old = make_connected_player(hass)
+        await old.async_added_to_hass()
+        amp = old._conn._conn
+        amp.queue.put_nowait(feedback("VIDEO 1", 30))
+        await settle()
+
+        await old.async_will_remove_from_hass()
+        # Arrives between the removal and the new entity being added
+        amp.queue.put_nowait(feedback("VIDEO 1", 31))
+        await settle()
+
+        new = make_connected_player(hass)
+        await new.async_added_to_hass()
+        assert new._conn._conn is amp
+        assert new._device_state.device_volume == 31
+        assert hass.data[DATA_PARKED_CONNECTIONS] == {}
+
+        amp.queue.put_nowait(feedback("VIDEO 1", 32))
+        await settle()
+        assert new._device_state.device_volume == 32
+        assert old._device_state.device_volume == 30
+        await new.cleanup()
+        return amp
+
+    amp = asyncio.run(run())
+    assert amp.opened == 1
+    assert amp.closed == 1
+    assert amp.sent == ["DISPLAY_REFRESH"]
+
+
+def test_parked_connection_closed_after_timeout(monkeypatch):
+    monkeypatch.setattr(media_player, "PARK_TIMEOUT", 0.01)
+
+    async def run():
+        hass = make_hass()
+        old = make_connected_player(hass)
+        await old.async_added_to_hass()
+        await old.async_will_remove_from_hass()
+        await asyncio.sleep(0.05)
+        assert hass.data[DATA_PARKED_CONNECTIONS] == {}
+        return old._conn._conn
+
+    amp = asyncio.run(run())
+    assert amp.closed == 1
+
+
+def test_changed_device_not_adopted():
+    async def run():
+        hass = make_hass()
+        old = make_connected_player(hass)
+        await old.async_added_to_hass()
+        await settle()
+        await old.async_will_remove_from_hass()
+
+        new = make_connected_player(hass)
+        new._conn_factory = RotelConnectionWrapperFactory(
+            "/dev/ttyUSB1", "rotel_test", RSP1570_META
+        )
+        await new.async_added_to_hass()
+        assert new._conn is not old._conn
+        await settle()
+        await new.cleanup()
+        return old._conn._conn, new._conn._conn
+
+    old_amp, new_amp = asyncio.run(run())
+    assert old_amp.closed == 1
+    assert new_amp.opened == 1
+
+
+def test_parked_connection_to_same_port_closed_before_open():
+    async def run():
+        hass = make_hass()
+        old = make_connected_player(hass)
+        old._attr_unique_id = "rotel_old"
+        await old.async_added_to_hass()
+        await settle()
+        await old.async_will_remove_from_hass()
+        old_amp = old._conn._conn
+
+        new = make_connected_player(hass)
+        new_amp = new._conn._conn
+        new_amp.open = lambda: check_closed_then_open(old_amp, new_amp)
+        await new.async_added_to_hass()
+        assert hass.data[DATA_PARKED_CONNECTIONS] == {}
+        await settle()
+        await new.cleanup()
+        return new_amp
+
+    async def check_closed_then_open(old_amp, new_amp):
+        assert old_amp.closed == 1
+        new_amp.opened += 1
+
+    new_amp = asyncio.run(run())
+    assert new_amp.opened == 1
+
+
+def test_removed_while_stopping_is_cleaned_up():
+    async def run():
+        hass = make_hass()
+        player = make_connected_player(hass)
+        await player.async_added_to_hass()
+        await settle()
+        hass.is_stopping = True
+        await player.async_will_remove_from_hass()
+        assert DATA_PARKED_CONNECTIONS not in hass.data
+        return player._conn._conn
+
+    amp = asyncio.run(run())
+    assert amp.closed == 1
+
+
+def test_parked_connection_closed_when_hass_stops():
+    async def run():
+        hass = make_hass()
+        stop_listeners = []
+        hass.bus.async_listen_once = lambda event, listener: (
+            stop_listeners.append(listener) or MagicMock()
+        )
+        old = make_connected_player(hass)
+        await old.async_added_to_hass()
+        await settle()
+        reader = old._read_messages_task
+        await old.async_will_remove_from_hass()
+        assert "rotel_test" in hass.data[DATA_PARKED_CONNECTIONS]
+        # HA stops before the parked connection times out
+        await stop_listeners[-1](None)
+        assert hass.data[DATA_PARKED_CONNECTIONS] == {}
+        assert reader.done()
+        return old._conn._conn
+
+    amp = asyncio.run(run())
+    assert amp.closed == 1
+
+
+def test_adopting_stops_listening_for_stop():
+    async def run():
+        hass = make_hass()
+        unsubscribe = MagicMock()
+        hass.bus.async_listen_once = MagicMock(return_value=unsubscribe)
+        old = make_connected_player(hass)
+        await old.async_added_to_hass()
+        await settle()
+        await old.async_will_remove_from_hass()
+        new = make_connected_player(hass)
+        await new.async_added_to_hass()
+        unsubscribe.assert_called_once()
+        await new.cleanup()
+
+    asyncio.run(run())
@@ -103,3 +103,96 @@ def test_schema_with_bad_source_for_rsp1572(rotel_schema, test_aliases_rsp1570):
         str(exc_info.value)
         == "not a valid value @ data['model_spec']['source_aliases']['TAPE']"
     )
+
+
+def test_schema_recorded_attributes_default(rotel_schema):
+    cfg_in = {
+        "device": "/dev/ttyUSB0",
+        "unique_id": "rotel_rsp1570",
+    }
+    cfg_out = rotel_schema(cfg_in)
+    assert cfg_out.get("recorded_attributes") == []
+
+
+def test_schema_attributes_default(rotel_schema):
+    cfg_in = {
+        "device": "/dev/ttyUSB0",
+        "unique_id": "rotel_rsp1570",
+    }
+    cfg_out = rotel_schema(cfg_in)
+    assert cfg_out.get("attributes") == [
+        "icons",
+        "speaker",
+        "sound_mode",
+        "input",
+        "state",
+        "misc",
+        "triggers",
+        "smart_display",
+    ]
+
+
+def test_schema_attributes_minimal(rotel_schema):
+    cfg_in = {
+        "device": "/dev/ttyUSB0",
+        "unique_id": "rotel_rsp1570",
+        "attributes": [],
+    }
+    cfg_out = rotel_schema(cfg_in)
+    assert cfg_out.get("attributes") == []
+
+
+def test_schema_recorded_attributes(rotel_schema):
+    cfg_in = {
+        "device": "/dev/ttyUSB0",
+        "unique_id": "rotel_rsp1570",
+        "recorded_attributes": ["triggers", "sound_mode"],
+    }
+    cfg_out = rotel_schema(cfg_in)
+    assert cfg_out.get("recorded_attributes") == ["triggers", "sound_mode"]
+
+
+def test_schema_bad_recorded_attributes(rotel_schema):
+    cfg_in = {
+        "device": "/dev/ttyUSB0",
+        "unique_id": "rotel_rsp1570",
+        "recorded_attributes": ["volume"],
+    }
+    with raises(vol.MultipleInvalid):
+        rotel_schema(cfg_in)
+
+
+def test_schema_io_thread(rotel_schema):
+    cfg_in = {
+        "device": "/dev/ttyUSB0",
+        "unique_id": "rotel_rsp1570",
+    }
+    assert rotel_schema(cfg_in).get("io_thread") is False
+    cfg_in["io_thread"] = True
+    assert rotel_schema(cfg_in).get("io_thread") is True
+
+
+def test_schema_mqtt_topic(rotel_schema):
+    cfg_in = {
+        "device": "/dev/ttyUSB0",
+        "unique_id": "rotel_rsp1570",
+    }
+    assert "mqtt_topic" not in rotel_schema(cfg_in)
+    cfg_in["mqtt_topic"] = "rotel/lounge"
+    assert rotel_schema(cfg_in)["mqtt_topic"] == "rotel/lounge"
+    cfg_in["mqtt_topic"] = "rotel/#"
+    with raises(vol.Invalid):
+        rotel_schema(cfg_in)
+
+
+def test_schema_power_on_timeout(rotel_schema):
+    cfg_in = {
+        "device": "/dev/ttyUSB0",
+        "unique_id": "rotel_rsp1570",
+    }
+    assert rotel_schema(cfg_in)["power_on_timeout"] == 15.0
+    cfg_in["power_on_timeout"] = 0
+    assert rotel_schema(cfg_in)["power_on_timeout"] == 0.0
+    cfg_in["power_on_timeout"] = 121
+    with raises(vol.Invalid):
+        rotel_schema(cfg_in)
@@ -0,0 +1,122 @@
+import asyncio
+
+from pytest import raises
+from rsp1570serial.rotel_model_meta import RSP1570_META
+
+from custom_components.rotel.media_player import (
+    RestoreCommand,
+    RotelDeviceState,
+    make_alias_source_map,
+    plan_restore_commands,
+)
+from homeassistant.exceptions import HomeAssistantError
+
+from .helpers import feedback, make_player, run_with_reader
+
+SOURCE_MAP = make_alias_source_map(RSP1570_META, {"VIDEO 3": "APPLE TV"})
+
+
+def on_state(source="VIDEO 1", volume=45, muted=False) -> RotelDeviceState:
+    return RotelDeviceState(
+        is_on=True, source=source, device_volume=volume, is_volume_muted=muted
+    )
+
+
+def test_plan_nothing_to_do():
+    assert plan_restore_commands(on_state(), on_state(), SOURCE_MAP) == []
+    assert plan_restore_commands(RotelDeviceState(), RotelDeviceState(), {}) == []
+
+
+def test_plan_power_off():
+    assert plan_restore_commands(on_state(), RotelDeviceState(), SOURCE_MAP) == [
+        RestoreCommand("POWER_OFF")
+    ]
+
+
+def test_plan_power_on_first():
+    assert plan_restore_commands(RotelDeviceState(), on_state(), SOURCE_MAP) == [
+        RestoreCommand("POWER_ON")
+    ]
+
+
+def test_plan_source_and_volume():
+    assert plan_restore_commands(on_state(), on_state("APPLE TV", 20), SOURCE_MAP) == [
+        RestoreCommand("SOURCE_VIDEO_3"),
+        RestoreCommand(device_volume=20),
+    ]
+
+
+def test_plan_unknown_source_skipped():
+    assert plan_restore_commands(on_state(), on_state("VIDEO 3"), SOURCE_MAP) == []
+
+
+def test_plan_mute_after_volume():
+    assert plan_restore_commands(
+        on_state(), on_state(volume=30, muted=True), SOURCE_MAP
+    ) == [RestoreCommand(device_volume=30), RestoreCommand("MAIN_ZONE_MUTE_ON")]
+
+
+def test_plan_unmute_before_volume():
+    # The device doesn't report the volume while muted
+    assert plan_restore_commands(
+        on_state(volume=None, muted=True), on_state(volume=30), SOURCE_MAP
+    ) == [RestoreCommand("MAIN_ZONE_MUTE_OFF"), RestoreCommand(device_volume=30)]
+
+
+def test_plan_unknown_saved_volume_skipped():
+    assert plan_restore_commands(
+        on_state(), on_state(volume=None, muted=True), SOURCE_MAP
+    ) == [RestoreCommand("MAIN_ZONE_MUTE_ON")]
+
+
+def test_restore_without_snapshot():
+    player = make_player({})
+    with raises(HomeAssistantError):
+        asyncio.run(player.async_restore(1.0))
+
+
+def test_restore_sends_only_needed_commands():
+    player = make_player({})
+    player.handle_message(feedback("APPLE TV", 20))
+    player.snapshot()
+    player.handle_message(feedback("VIDEO 1", 20))
+
+    asyncio.run(player.async_restore(1.0))
+    assert player._conn._conn.sent == ["SOURCE_VIDEO_3"]
+
+
+def test_restore_turns_on_then_restores():
+    player = make_player({"POWER_ON": [feedback("VIDEO 1", 45)]})
+    player.handle_message(feedback("APPLE TV", 20))
+    player.snapshot()
+    player._set_device_state(RotelDeviceState())
+
+    async def run():
+        await run_with_reader(player, player.async_restore(1.0))
+
+    asyncio.run(run())
+    sent = [c for c in player._conn._conn.sent if c != "DISPLAY_REFRESH"]
+    assert sent == [
+        "POWER_ON",
+        "SOURCE_VIDEO_3",
+        ("VOLUME_DIRECT", 1, 20),
+    ]
+
+
+def test_restore_cancels_volume_ramp():
+    player = make_player(run_tasks=True)
+    player.handle_message(feedback("VIDEO 1", 20))
+    player.snapshot()
+
+    async def run():
+        await player.async_ramp_volume(0.8, 10.0)
+        await asyncio.sleep(0.05)
+        await player.async_restore(1.0)
+        assert player._volume_ramp_task is None
+        sent = len(player._conn._conn.sent)
+        await asyncio.sleep(0.05)
+        return sent
+
+    sent = asyncio.run(run_with_reader(player, run()))
+    assert len(player._conn._conn.sent) == sent
+    assert player._conn._conn.sent[-1] == ("VOLUME_DIRECT", 1, 20)
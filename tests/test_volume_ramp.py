@@ -0,0 +1,149 @@
+import asyncio
+
+from pytest import approx, raises
+
+from custom_components.rotel.media_player import (
+    FEEDBACK_LATENCY_SMOOTHING,
+    next_ramp_volume,
+    update_feedback_latency,
+)
+from homeassistant.exceptions import HomeAssistantError
+
+from .helpers import feedback, make_player, run_with_reader
+
+
+def make_ramping_player(volume=20):
+    player = make_player(run_tasks=True)
+    player.handle_message(feedback("VIDEO 1", volume))
+    return player
+
+
+def volumes_sent(player):
+    return [c[2] for c in player._conn._conn.sent if c[0] == "VOLUME_DIRECT"]
+
+
+async def wait_for_ramp(player):
+    task = player._volume_ramp_task
+    await task
+    return task
+
+
+def test_ramp_up_evenly():
+    # 20 steps to go in 2s at 0.1s per step
+    assert next_ramp_volume(20, 40, 2.0, 0.1) == 21
+
+
+def test_ramp_down_evenly():
+    assert next_ramp_volume(40, 20, 2.0, 0.1) == 39
+
+
+def test_ramp_slow_feedback_takes_bigger_steps():
+    # Only 4 steps fit into the remaining time
+    assert next_ramp_volume(20, 40, 2.0, 0.5) == 25
+
+
+def test_ramp_out_of_time_jumps_to_target():
+    assert next_ramp_volume(20, 40, 0.0, 0.1) == 40
+    assert next_ramp_volume(40, 20, -1.0, 0.1) == 20
+
+
+def test_ramp_at_target():
+    assert next_ramp_volume(30, 30, 2.0, 0.1) == 30
+
+
+def test_ramp_never_overshoots():
+    current = 10
+    while current != 13:
+        current = next_ramp_volume(current, 13, 0.05, 0.1)
+        assert 10 < current <= 13
+
+
+def test_update_feedback_latency():
+    assert update_feedback_latency(0.2, 0.2) == approx(0.2)
+    assert update_feedback_latency(0.2, 1.2) == approx(0.2 + FEEDBACK_LATENCY_SMOOTHING)
+
+
+def test_ramp_paced_by_feedback_reaches_target():
+    player = make_ramping_player(20)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.sleep(0)
+        await player.async_ramp_volume(0.5, 0.5)
+        await wait_for_ramp(player)
+        return loop.time() - start
+
+    elapsed = asyncio.run(run_with_reader(player, run()))
+    volumes = volumes_sent(player)
+    assert volumes[-1] == 48
+    assert volumes == sorted(volumes)
+    # Paced at one step per MIN_RAMP_STEP_INTERVAL rather than all at once
+    assert 3 <= len(volumes) <= 6
+    assert 0.3 <= elapsed < 1.0
+    assert player._device_state.device_volume == 48
+
+
+def test_new_ramp_cancels_ramp_in_progress():
+    player = make_ramping_player(20)
+
+    async def run():
+        await asyncio.sleep(0)
+        await player.async_ramp_volume(0.9, 10.0)
+        first = player._volume_ramp_task
+        await asyncio.sleep(0.25)
+        await player.async_ramp_volume(0.1, 0.0)
+        assert first.cancelled()
+        await wait_for_ramp(player)
+        up = volumes_sent(player)
+        await asyncio.sleep(0.2)
+        return up
+
+    up = asyncio.run(run_with_reader(player, run()))
+    assert up[-1] == 10
+    assert all(20 < v < 86 for v in up[:-1])
+    # Nothing more from the cancelled ramp
+    assert volumes_sent(player) == up
+
+
+def test_ramp_abandoned_without_feedback(caplog):
+    player = make_ramping_player(20)
+    player._feedback_latency = 0.02
+    sent = []
+
+    async def no_feedback(zone, volume):
+        sent.append(volume)
+
+    player._conn._conn.send_volume_direct_command = no_feedback
+
+    async def run():
+        await asyncio.sleep(0)
+        await player.async_ramp_volume(0.5, 2.0)
+        return await wait_for_ramp(player)
+
+    task = asyncio.run(run_with_reader(player, run()))
+    assert task.exception() is None
+    assert len(sent) == 1
+    assert "abandoning volume ramp" in caplog.text
+
+
+def test_ramp_write_failure_logged(caplog):
+    player = make_ramping_player(20)
+
+    async def unplugged(zone, volume):
+        raise ConnectionResetError("device unplugged")
+
+    player._conn._conn.send_volume_direct_command = unplugged
+
+    async def run():
+        await asyncio.sleep(0)
+        await player.async_ramp_volume(0.5, 1.0)
+        task = await wait_for_ramp(player)
+        player._conn.breaker.trip("device unplugged")
+        with raises(HomeAssistantError, match="rotel_reconnect"):
+            await player.async_ramp_volume(0.5, 1.0)
+        return task
+
+    task = asyncio.run(run_with_reader(player, run()))
+    assert task.exception() is None
+    assert "Could not ramp volume of rotel_test" in caplog.text
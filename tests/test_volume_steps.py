@@ -0,0 +1,137 @@
+import asyncio
+
+from pytest import raises
+
+from homeassistant.exceptions import HomeAssistantError
+
+from .helpers import feedback, make_player, run_with_reader
+
+
+def make_stepping_player(volume=None):
+    player = make_player(run_tasks=True)
+    if volume is not None:
+        player.handle_message(feedback("VIDEO 1", volume))
+    return player
+
+
+async def press(player, *steps, interval=0.01):
+    for step in steps:
+        if step > 0:
+            await player.async_volume_up()
+        else:
+            await player.async_volume_down()
+        await asyncio.sleep(interval)
+
+
+async def wait_for_steps(player):
+    while player._volume_step_task is not None:
+        await asyncio.sleep(0.01)
+
+
+def test_presses_sent_as_one_command():
+    player = make_stepping_player(20)
+
+    async def run():
+        await press(player, 1, 1, 1, 1, 1)
+        await wait_for_steps(player)
+
+    asyncio.run(run_with_reader(player, run()))
+    assert player._conn._conn.sent == ["DISPLAY_REFRESH", ("VOLUME_DIRECT", 1, 25)]
+    assert player._device_state.device_volume == 25
+
+
+def test_presses_that_cancel_out_send_nothing():
+    player = make_stepping_player(20)
+
+    async def run():
+        await press(player, 1, 1, -1, -1)
+        await wait_for_steps(player)
+
+    asyncio.run(run_with_reader(player, run()))
+    assert player._conn._conn.sent == ["DISPLAY_REFRESH"]
+
+
+def test_presses_clamped_to_max_volume():
+    player = make_stepping_player(94)
+
+    async def run():
+        await press(player, 1, 1, 1)
+        await wait_for_steps(player)
+
+    asyncio.run(run_with_reader(player, run()))
+    assert player._conn._conn.sent[-1] == ("VOLUME_DIRECT", 1, 96)
+
+
+def test_presses_after_window_sent_separately():
+    player = make_stepping_player(20)
+
+    async def run():
+        await press(player, -1, -1, interval=0.3)
+        await wait_for_steps(player)
+
+    asyncio.run(run_with_reader(player, run()))
+    assert player._conn._conn.sent[1:] == [
+        ("VOLUME_DIRECT", 1, 19),
+        ("VOLUME_DIRECT", 1, 18),
+    ]
+
+
+def test_unknown_volume_steps_device():
+    player = make_stepping_player()
+
+    async def run():
+        await press(player, 1, -1)
+
+    asyncio.run(run_with_reader(player, run()))
+    sent = [c for c in player._conn._conn.sent if c != "DISPLAY_REFRESH"]
+    assert sent == ["VOLUME_UP", "VOLUME_DOWN"]
+    assert player._volume_step_task is None
+
+
+def test_set_volume_level_cancels_ramp():
+    player = make_stepping_player(20)
+
+    async def run():
+        await player.async_ramp_volume(0.8, 10.0)
+        await asyncio.sleep(0.05)
+        await player.async_set_volume_level(0.5)
+        assert player._volume_ramp_task is None
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run_with_reader(player, run()))
+    assert player._conn._conn.sent[-1] == ("VOLUME_DIRECT", 1, 48)
+
+
+def test_write_failure_logged(caplog):
+    player = make_stepping_player(20)
+
+    async def unplugged(zone, volume):
+        raise ConnectionResetError("device unplugged")
+
+    player._conn._conn.send_volume_direct_command = unplugged
+
+    async def run():
+        await press(player, 1, 1)
+        task = player._volume_step_task
+        await wait_for_steps(player)
+        return task
+
+    task = asyncio.run(run_with_reader(player, run()))
+    assert task.exception() is None
+    assert "Could not step volume of rotel_test" in caplog.text
+    assert player._conn.breaker.failures == 1
+
+
+def test_every_press_fails_while_breaker_open():
+    player = make_stepping_player(20)
+
+    async def run():
+        await asyncio.sleep(0)
+        await player.async_volume_up()
+        player._conn.breaker.trip("device unplugged")
+        with raises(HomeAssistantError, match="rotel_reconnect"):
+            await player.async_volume_up()
+        await wait_for_steps(player)
+
+    asyncio.run(run_with_reader(player, run()))
+    assert player._conn._conn.sent == ["DISPLAY_REFRESH"]